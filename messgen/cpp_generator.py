@@ -151,9 +151,11 @@ class CppGenerator:
         self._includes: set = set()
         self._ctx: dict = {}
         self._types: dict[str, MessgenType] = {}
+        self._type_hashes: dict[str, int | None] = {}
 
     def generate_types(self, out_dir: Path, types: dict[str, MessgenType]) -> None:
         self._types = types
+        self._type_hashes = {}
         for type_name, type_def in self._types.items():
             if type_def.type_class not in [TypeClass.struct, TypeClass.enum, TypeClass.bitset]:
                 continue
@@ -164,6 +166,7 @@ class CppGenerator:
 
     def generate_protocols(self, out_dir: Path, types: dict[str, MessgenType], protocols: dict[str, Protocol]) -> None:
         self._types = types
+        self._type_hashes = {}
         for proto_name, proto_def in protocols.items():
             file_name = out_dir / (proto_name + self._EXT_HEADER)
             file_name.parent.mkdir(parents=True, exist_ok=True)
@@ -525,7 +528,7 @@ class CppGenerator:
                 f"""
             namespace detail {{
             static constexpr ::messgen::metadata {unqual_name}_METADATA{{
-                .hash = {hash_type(type_def, self._types)}ULL,
+                .hash = {hash_type(type_def, self._types, self._type_hashes)}ULL,
                 .name = "{type_name}",
                 .schema = R"_({get_schema(type_def)})_"
             }};
@@ -632,7 +635,7 @@ class CppGenerator:
                 using bitset_base::bitset_base;
                 constexpr {unqual_name}(Values other) : {unqual_name}{{underlying_type(other)}} {{}}
 
-                static constexpr uint64_t HASH = {hash_type(type_def, self._types)}ULL;
+                static constexpr uint64_t HASH = {hash_type(type_def, self._types, self._type_hashes)}ULL;
                 static constexpr std::string_view NAME = "{type_name}";
                 static constexpr std::string_view SCHEMA = R"_({get_schema(type_def)})_";
                 static constexpr ::messgen::metadata METADATA{{
@@ -671,7 +674,7 @@ class CppGenerator:
                 f"""
             namespace detail {{
             static constexpr ::messgen::metadata {unqual_name}_METADATA{{
-                .hash = {hash_type(type_def, self._types)}ULL,
+                .hash = {hash_type(type_def, self._types, self._type_hashes)}ULL,
                 .name = "{type_name}",
                 .schema = R"_({get_schema(type_def)})_"
             }};
@@ -849,7 +852,7 @@ class CppGenerator:
         code.append(_indent(f"static constexpr bool NEED_ALLOC = {need_alloc_str};"))
 
         # Metadata
-        type_hash = hash_type(type_def, self._types)
+        type_hash = hash_type(type_def, self._types, self._type_hashes)
         deps_str_list = []
         for dep in sorted(list(self._get_schema_dependencies(type_def))):
             dep_type_def = self._types[dep]
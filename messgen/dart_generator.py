@@ -884,8 +884,9 @@ def render_protocol(proto_name: str, proto_class_name: str, proto_full_path: str
     # Compute protocol hash
     proto_hash = 0
     message_hashes = {}
+    type_hashes: dict[str, int | None] = {}
     for msg_id, msg in proto.messages.items():
-        type_hash = hash_type(types[msg.type], types)
+        type_hash = hash_type(types[msg.type], types, type_hashes)
         msg_hash = hash_message(msg) ^ type_hash if type_hash else 0
         proto_hash ^= msg_hash
         # Store message hash as-is for BigInt
@@ -1077,6 +1078,7 @@ class DartGenerator:
     def __init__(self, options: dict):
         self._options: dict = options
         self._types: dict[str, MessgenType] = {}
+        self._type_hashes: dict[str, int | None] = {}
         self._resolved: dict[str, ResolvedType] = {}
         self._out_dir: Path | None = None
         self._protocols: dict[str, Protocol] = {}
@@ -1115,7 +1117,7 @@ class DartGenerator:
             base = self.generate_type(out_dir, bitset_type.base_type, ident+2)
             resolved = ResolvedBitset(bitset_type, base, package)
         elif type_def.type_class == TypeClass.struct:
-            struct_hash: int | None = hash_type(type_def, self._types)
+            struct_hash: int | None = hash_type(type_def, self._types, self._type_hashes)
 
             struct_type = cast(StructType, type_def)
             resolved_struct = ResolvedStruct(struct_type, struct_hash, package)
@@ -1135,6 +1137,7 @@ class DartGenerator:
 
     def generate_types(self, out_dir: Path, types: dict[str, MessgenType]) -> None:
         self._types = types
+        self._type_hashes = {}
         self._out_dir = out_dir
 
         for type_name, _ in types.items():
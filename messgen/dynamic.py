@@ -1,14 +1,31 @@
+import bisect
+import enum
+import inspect
 import json
+import keyword
 import struct
 import typing
 
+from collections.abc import (
+    Mapping,
+    Sequence,
+)
+
+from .common import SIZE_TYPE
 from .yaml_parser import parse_types, parse_protocols
 from abc import (
     ABC,
     abstractmethod,
 )
+from dataclasses import (
+    dataclass,
+)
 from decimal import (
+    Context,
     Decimal,
+    MAX_EMAX,
+    MAX_PREC,
+    MIN_EMIN,
 )
 from pathlib import (
     Path,
@@ -29,6 +46,11 @@ from .model import (
     VectorType
 )
 
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]
+
 STRUCT_TYPES_MAP = {
     "uint8": "B",
     "int8": "b",
@@ -45,11 +67,33 @@ STRUCT_TYPES_MAP = {
 
 
 class JSONEncoder(json.JSONEncoder):
+    def iterencode(self, o, _one_shot=False):
+        # IntEnum members are ints, encoded as numbers before `default` is asked, so they are replaced by names first
+        return super().iterencode(self._enum_names(o), _one_shot)
+
+    @classmethod
+    def _enum_names(cls, o):
+        if isinstance(o, enum.Enum):
+            return o.name
+        elif isinstance(o, dict):
+            return {cls._enum_names(k): cls._enum_names(v) for k, v in o.items()}
+        elif isinstance(o, Record):
+            return cls._enum_names(o._asdict())
+        elif isinstance(o, (list, tuple)):
+            return [cls._enum_names(v) for v in o]
+        elif isinstance(o, (set, frozenset)):
+            return {cls._enum_names(v) for v in o}
+        return o
+
     def default(self, o):
-        if isinstance(o, bytes):
+        if isinstance(o, (bytes, memoryview)):
             return f"0x{o.hex()}"
         elif isinstance(o, Decimal):
             return str(o)
+        elif isinstance(o, Record):
+            return o._asdict()
+        elif isinstance(o, (set, frozenset)):
+            return sorted(o)
         return super().default(o)
 
 
@@ -57,19 +101,222 @@ class MessgenError(Exception):
     pass
 
 
+@dataclass(frozen=True)
+class CodecOptions:
+    """Options shared by all converters created by a `Codec`."""
+
+    # Decode vectors and arrays of scalars as `numpy.ndarray` views over the input buffer,
+    # enum and bitset elements are decoded as raw integers. Requires numpy.
+    numpy: bool = False
+
+    # Decode structs into `__slots__` record classes generated per struct type instead of dicts
+    records: bool = False
+
+    # Decode bytes fields as memoryview slices of the input buffer instead of copies. The slices are only
+    # valid while the input buffer is alive and unchanged, they also keep a bytearray input from being resized.
+    bytes_view: bool = False
+
+    # Decoded form of bitsets: "list" of set bit names, "int" raw value or "frozenset" of set bit names.
+    # Any of them is accepted on encoding.
+    bitset_mode: str = "list"
+
+    # Decoded form of enums: "name" string or "int_enum" member of an `enum.IntEnum` generated per enum type.
+    # Names, members and plain values are accepted on encoding.
+    enum_mode: str = "name"
+
+    def __post_init__(self) -> None:
+        if self.numpy and np is None:
+            raise MessgenError("numpy is required for CodecOptions(numpy=True)")
+        if self.bitset_mode not in ("list", "int", "frozenset"):
+            raise MessgenError(f"Unsupported bitset_mode={self.bitset_mode}")
+        if self.enum_mode not in ("name", "int_enum"):
+            raise MessgenError(f"Unsupported enum_mode={self.enum_mode}")
+
+
+class Record:
+    """Base of the `__slots__` record classes generated for struct types, see `CodecOptions.records`.
+
+    Fields are set positionally in declaration order. `get` and `__getitem__` mirror the dict
+    access used by serialization, so records and dicts can be serialized interchangeably.
+    """
+
+    __slots__: tuple[str, ...] = ()
+    __hash__ = None  # type: ignore[assignment]
+
+    def get(self, field_name: str, default: typing.Any = None) -> typing.Any:
+        return getattr(self, field_name, default)
+
+    def __getitem__(self, field_name: str) -> typing.Any:
+        try:
+            return getattr(self, field_name)
+        except AttributeError:
+            raise KeyError(field_name) from None
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, field_name) == getattr(other, field_name) for field_name in self.__slots__)
+
+    def __repr__(self) -> str:
+        items = ", ".join(f"{field_name}={getattr(self, field_name)!r}" for field_name in self.__slots__)
+        return f"{type(self).__name__}({items})"
+
+    def _asdict(self) -> dict:
+        return {field_name: getattr(self, field_name) for field_name in self.__slots__}
+
+
+def _make_record_class(type_name: str, field_names: list[str]) -> type[Record]:
+    for field_name in field_names:
+        # Private names are mangled by the class, so they can't be slots
+        mangled = field_name.startswith("__") and not field_name.endswith("__")
+        if keyword.iskeyword(field_name) or hasattr(Record, field_name) or mangled:
+            raise MessgenError(f"Unsupported record field={field_name} in type_name={type_name}")
+
+    # The instance argument is named apart from every field
+    self_name = "_self"
+    while self_name in field_names:
+        self_name = "_" + self_name
+    namespace: dict[str, typing.Any] = {}
+    body = "".join(f"\n    {self_name}.{field_name} = {field_name}" for field_name in field_names) or "\n    pass"
+    exec(f"def __init__({self_name}, {', '.join(field_names)}):{body}", namespace)
+
+    class_name = type_name.split("/")[-1]
+    return type(class_name, (Record,), {
+        "__slots__": tuple(field_names),
+        "__init__": namespace["__init__"],
+        "__qualname__": class_name,
+        "__module__": __name__,
+    })
+
+
+class _CodeGen:
+    """Source builder for the specialized encode/decode functions produced by `TypeConverter.compile`."""
+
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+        self.namespace: dict[str, typing.Any] = {"unpack_from": struct.unpack_from, "pack": struct.pack}
+        self._const_names: dict[int, str] = {}
+        self._struct_names: dict[str, str] = {}
+        self._counter = 0
+
+    def var(self, prefix: str = "v") -> str:
+        self._counter += 1
+        return f"{prefix}{self._counter}"
+
+    def const(self, value: typing.Any) -> str:
+        if (name := self._const_names.get(id(value))) is None:
+            name = self.var("_c")
+            self._const_names[id(value)] = name
+            self.namespace[name] = value
+        return name
+
+    def struct(self, fmt: str) -> tuple[str, int]:
+        if (name := self._struct_names.get(fmt)) is None:
+            name = self.var("_s")
+            self._struct_names[fmt] = name
+            self.namespace[name] = struct.Struct("<" + fmt)
+        return name, self.namespace[name].size
+
+    def emit(self, indent: int, line: str) -> None:
+        self.lines.append("    " * indent + line)
+
+    def build(self) -> dict[str, typing.Any]:
+        exec("\n".join(self.lines), self.namespace)
+        return self.namespace
+
+
+class _IovWriter:
+    """Collects segments for `TypeConverter.serialize_iov`, coalescing small writes."""
+
+    def __init__(self, min_segment_size: int) -> None:
+        self.min_segment_size = min_segment_size
+        self._segments: list[bytes | memoryview] = []
+        self._pending = bytearray()
+
+    def write(self, data: bytes) -> None:
+        self._pending += data
+
+    def write_buffer(self, data: typing.Any) -> None:
+        """Write a buffer-protocol object, large ones are referenced instead of copied."""
+        view = memoryview(data)
+        if view.nbytes < self.min_segment_size:
+            self._pending += view
+            return
+        self._flush()
+        self._segments.append(data if isinstance(data, bytes) else view.cast("B"))
+
+    def segments(self) -> list[bytes | memoryview]:
+        self._flush()
+        return self._segments
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._segments.append(bytes(self._pending))
+            self._pending.clear()
+
+
 class TypeConverter(ABC):
-    def __init__(self, types: dict[str, MessgenType], type_name: str):
+    def __init__(self, types: dict[str, MessgenType], type_name: str, converters: dict[str, "TypeConverter"] | None = None,
+                 options: CodecOptions | None = None):
+        self._types = types
+        self._converters = converters if converters is not None else {}
+        self._options = options if options is not None else CodecOptions()
         self._type_name = type_name
         self._type_def = types[type_name]
         self._type_class = self._type_def.type_class
-        self._type_hash = hash_type(self._type_def, types)
-        if not self._type_hash:
+        if any(dependency not in types for dependency in self._type_def.dependencies()):
             raise MessgenError(f"Invalid type_name={type_name}")
+        self._type_hash: int | None = None
+        self._size_bounds: tuple[int, int | None] | None = None
+
+        # Set if values of the type may contain buffers passed by reference by `serialize_iov`
+        self.iov_passthrough = False
+
+        # Struct format of the type when it can be packed with a single `struct.Struct`
+        # together with the enclosing fixed-size struct, None otherwise.
+        self.flat_fmt: str | None = None
+
+        # Specialized functions generated by `compile()`
+        self._compiled_serialize: typing.Callable | None = None
+        self._compiled_deserialize: typing.Callable | None = None
+
+        # Encoded default value, spliced in for absent struct fields, computed on first use
+        self._default_bytes: bytes | None = None
+        self._default_flat: tuple | None = None
 
     def type_name(self) -> str:
         return self._type_name
 
+    def _create_converter(self, type_name: str) -> "TypeConverter":
+        return create_type_converter(self._types, type_name, self._converters, self._options)
+
+    def _numpy_dtype(self, element_type: "TypeConverter") -> typing.Any:
+        """Little-endian numpy dtype of `element_type` when its sequences are decoded as ndarrays, None otherwise."""
+        if self._options.numpy and isinstance(element_type, (ScalarConverter, EnumConverter, BitsetConverter)):
+            return np.dtype("<" + typing.cast(str, element_type.flat_fmt))
+        return None
+
+    def _ndarray_elements(self, data, dtype) -> typing.Any:
+        """`data` as a contiguous ndarray of `dtype`, sequences are serialized only from 1-D ndarrays."""
+        if data.ndim != 1:
+            raise MessgenError(f"Expected 1-D ndarray, got shape={data.shape} for type_name={self._type_name}")
+        return np.ascontiguousarray(data, dtype=dtype)
+
+    def _serialize_ndarray_into(self, data, dtype, buf, offset: int) -> int:
+        data = self._ndarray_elements(data, dtype)
+        end = offset + data.nbytes
+        if end > len(buf):
+            raise struct.error(f"pack_into requires a buffer of at least {end} bytes")
+        memoryview(buf)[offset:end] = data.view(np.uint8)
+        return end
+
     def type_hash(self) -> int:
+        if self._type_hash is None:
+            # Dependencies are interned converters, so every type of the graph is hashed only once
+            dependency_hashes: dict[str, int | None] = {
+                dependency: self._create_converter(dependency).type_hash() for dependency in self._type_def.dependencies()
+            }
+            self._type_hash = hash_type(self._type_def, self._types, dependency_hashes)
         assert self._type_hash
         return self._type_hash
 
@@ -79,13 +326,88 @@ class TypeConverter(ABC):
     def type_schema(self) -> str:
         return get_schema(self._type_def)
 
+    def compile(self) -> None:
+        """Generate specialized encode/decode functions for the whole converter tree.
+
+        Nested converters are inlined into a single function per direction, the
+        interpretive `_serialize`/`_deserialize` stay available as a fallback.
+        """
+        gen = _CodeGen()
+        gen.emit(0, "def decode(buf, off):")
+        value = self._emit_deserialize(gen, 1)
+        gen.emit(1, f"return {value}, off")
+        gen.emit(0, "")
+        gen.emit(0, "def encode(data):")
+        gen.emit(1, "out = []")
+        gen.emit(1, "out_append = out.append")
+        self._emit_serialize(gen, 1, "data")
+        gen.emit(1, 'return b"".join(out)')
+
+        functions = gen.build()
+        self._compiled_deserialize = functions["decode"]
+        self._compiled_serialize = functions["encode"]
+
+    def serialized_size(self, data: typing.Any) -> int:
+        """Size of `data` once serialized, fixed-size parts are not walked."""
+        return self._serialized_size(data)
+
+    def min_size(self) -> int:
+        """Smallest possible serialized size of the type."""
+        return self._get_size_bounds()[0]
+
+    def max_size(self) -> int | None:
+        """Largest possible serialized size of the type, None if unbounded."""
+        return self._get_size_bounds()[1]
+
+    def _get_size_bounds(self) -> tuple[int, int | None]:
+        if self._size_bounds is None:
+            if (size := self._type_def.size) is not None:
+                self._size_bounds = (size, size)
+            else:
+                self._size_bounds = self._variable_size_bounds()
+        return self._size_bounds
+
+    def _variable_size_bounds(self) -> tuple[int, int | None]:
+        return 0, None
+
     def serialize(self, data: dict | Decimal) -> bytes:
+        if self._compiled_serialize is not None:
+            return self._compiled_serialize(data)
         return self._serialize(data)
 
-    def deserialize(self, data: bytes | memoryview) -> dict:
+    def serialize_iov(self, data: typing.Any, min_segment_size: int = 4096) -> list[bytes | memoryview]:
+        """Serialize `data` into a list of segments, e.g. for `socket.sendmsg`.
+
+        Bytes fields and ndarray vectors of at least `min_segment_size` bytes are referenced
+        as is instead of being copied, all other parts are coalesced into bytes segments.
+        """
+        writer = _IovWriter(min_segment_size)
+        self._serialize_iov(data, writer)
+        return writer.segments()
+
+    def serialize_into(self, data: dict | Decimal, buf: bytearray | memoryview, offset: int = 0) -> int:
+        """Serialize `data` into a caller-owned buffer starting at `offset`.
+
+        Returns the offset right after the serialized message. The buffer is not resized,
+        if it is too small MessgenError is raised and the buffer content after `offset` is undefined.
+        """
+        try:
+            return self._serialize_into(data, buf, offset)
+        except struct.error as e:
+            raise MessgenError(
+                f'Failed to serialize buffer_size={len(buf)} offset={offset} type_name={self._type_name} error="{e}"') from e
+
+    def deserialize(self, data: bytes | memoryview, fields: typing.Sequence[str] | None = None) -> dict:
+        """Deserialize a message, if `fields` are given only these paths are decoded, see `projection`."""
+        if fields is not None:
+            return self.projection(fields).deserialize(data)
+
         data = memoryview(data)
         try:
-            msg, sz = self._deserialize(data)
+            if self._compiled_deserialize is not None:
+                msg, sz = self._compiled_deserialize(data, 0)
+            else:
+                msg, sz = self._deserialize_from(data, 0)
         except Exception as e:
             raise MessgenError(
                 f'Failed to deserialize data_size={len(data)} type_name={self._type_name} error="{e}"') from e
@@ -95,22 +417,163 @@ class TypeConverter(ABC):
 
         return msg
 
-    @abstractmethod
+    def decode_batch(self, payloads: typing.Iterable[bytes | memoryview], columns: bool = False) -> typing.Any:
+        """Decode payloads of a fixed size type into a single numpy structured array.
+
+        The array is laid out as the wire format, so payloads are copied once and never
+        converted per record. Enums and bitsets are kept as raw integers, decimals as raw bits.
+        If `columns` is set, a dict of per-field column views is returned instead. Requires numpy.
+        """
+        if np is None:
+            raise MessgenError("numpy is required for decode_batch")
+        if (dtype := self._batch_dtype()) is None:
+            raise MessgenError(f"decode_batch requires a fixed size type, type_name={self._type_name}")
+
+        payloads = list(payloads)
+        for payload in payloads:
+            if len(payload) != dtype.itemsize:
+                raise MessgenError(f"Invalid message size expected={dtype.itemsize} actual={len(payload)} type_name={self._type_name}")
+
+        if dtype.itemsize == 0:
+            records = np.zeros(len(payloads), dtype)
+        else:
+            records = np.frombuffer(b"".join(payloads), dtype)
+
+        if columns:
+            return {name: records[name] for name in dtype.names or ()}
+        return records
+
+    def _batch_dtype(self) -> typing.Any:
+        """Packed little-endian numpy dtype matching the wire layout, None if the type has no fixed size."""
+        if self.flat_fmt is not None and len(self.flat_fmt) == 1:
+            return np.dtype("<" + self.flat_fmt)
+        return None
+
+    def projection(self, fields: typing.Sequence[str]) -> "Projection":
+        raise MessgenError(f"Projection requires a struct type, type_name={self._type_name}")
+
+    def view(self, data: bytes | memoryview) -> typing.Any:
+        """Return a lazy view of the message in `data`, analogous to the C++ `Mode.VIEW`.
+
+        Structs are returned as `StructView` that decodes fields on access, vectors and arrays of
+        composite elements as `SequenceView`, other values are decoded right away. The view keeps
+        a reference to `data` and does not validate the message size.
+        """
+        return self._view_from(memoryview(data), 0)
+
+    def _view_from(self, buf: memoryview, offset: int) -> typing.Any:
+        return self._deserialize_from(buf, offset)[0]
+
+    def _skip(self, buf: memoryview, offset: int) -> int:
+        """Return the offset right after the value at `offset` without decoding it where possible."""
+        if (size := self._type_def.size) is not None:
+            return offset + size
+        return self._deserialize_from(buf, offset)[1]
+
+    def _serialize_iov(self, data, writer: _IovWriter) -> None:
+        writer.write(self.serialize(data))
+
     def _serialize(self, data) -> bytes:
+        if (size := self._type_def.size) is not None:
+            buf = bytearray(size)
+            self._serialize_into(data, buf, 0)
+            return bytes(buf)
+
+        out = bytearray()
+        self._serialize_to(data, out)
+        return bytes(out)
+
+    def _serialize_to(self, data, out: bytearray) -> None:
+        """Append serialized `data` to `out`, variable size types are encoded in a single pass this way."""
+        if self._type_def.size is not None:
+            out += self._serialize(data)
+            return
+
+        offset = len(out)
+        out += bytes(self._serialized_size(data))
+        self._serialize_into(data, out, offset)
+
+    @abstractmethod
+    def _serialized_size(self, data) -> int:
+        pass
+
+    @abstractmethod
+    def _serialize_into(self, data, buf: bytearray | memoryview, offset: int) -> int:
         pass
 
     @abstractmethod
-    def _deserialize(self, data) -> tuple[typing.Any, int]:
+    def _deserialize_from(self, buf: bytes | memoryview, offset: int) -> tuple[typing.Any, int]:
         pass
 
     @abstractmethod
     def default_value(self) -> typing.Any:
         pass
 
+    def default_bytes(self) -> bytes:
+        """Serialized `default_value()`, computed once per converter."""
+        if self._default_bytes is None:
+            self._default_bytes = self._serialize(self.default_value())
+        return self._default_bytes
+
+    def _default_flat_values(self) -> tuple:
+        if self._default_flat is None:
+            out: list = []
+            self._flatten(self.default_value(), out)
+            self._default_flat = tuple(out)
+        return self._default_flat
+
+    # Flat layout protocol: converters setting `flat_fmt` implement `_flatten`/`_unflatten` and their `_emit_*` variants
+    # to pack their values as items of a struct shared with the enclosing type, other converters never get there.
+    def _flatten(self, data, out: list) -> None:
+        raise MessgenError(f"Type {self._type_name} has no flat layout")
+
+    def _unflatten(self, values: tuple, idx: int) -> tuple[typing.Any, int]:
+        raise MessgenError(f"Type {self._type_name} has no flat layout")
+
+    def _emit_deserialize(self, gen: _CodeGen, indent: int) -> str:
+        value = gen.var()
+        if self.flat_fmt is not None:
+            values = gen.var("t")
+            struct_name, size = gen.struct(self.flat_fmt)
+            gen.emit(indent, f"{values} = {struct_name}.unpack_from(buf, off)")
+            gen.emit(indent, f"off += {size}")
+            expr, _ = self._emit_unflatten(gen, indent, values, 0)
+            gen.emit(indent, f"{value} = {expr}")
+        else:
+            gen.emit(indent, f"{value}, off = {gen.const(self._deserialize_from)}(buf, off)")
+        return value
+
+    def _emit_serialize(self, gen: _CodeGen, indent: int, expr: str) -> None:
+        if self.flat_fmt is not None:
+            args: list[str] = []
+            self._emit_flatten(gen, indent, expr, args)
+            gen.emit(indent, f"out_append({gen.struct(self.flat_fmt)[0]}.pack({', '.join(args)}))")
+        else:
+            gen.emit(indent, f"out_append({gen.const(self._serialize)}({expr}))")
+
+    @staticmethod
+    def _emit_read_size(gen: _CodeGen, indent: int) -> str:
+        n = gen.var("n")
+        struct_name, size = gen.struct(STRUCT_TYPES_MAP[SIZE_TYPE])
+        gen.emit(indent, f"{n} = {struct_name}.unpack_from(buf, off)[0]")
+        gen.emit(indent, f"off += {size}")
+        return n
+
+    @staticmethod
+    def _emit_write_size(gen: _CodeGen, indent: int, expr: str) -> None:
+        gen.emit(indent, f"out_append({gen.struct(STRUCT_TYPES_MAP[SIZE_TYPE])[0]}.pack(len({expr})))")
+
+    def _emit_flatten(self, gen: _CodeGen, indent: int, expr: str, args: list[str]) -> None:
+        raise MessgenError(f"Type {self._type_name} has no flat layout")
+
+    def _emit_unflatten(self, gen: _CodeGen, indent: int, values: str, idx: int) -> tuple[str, int]:
+        raise MessgenError(f"Type {self._type_name} has no flat layout")
+
 
 class ScalarConverter(TypeConverter):
-    def __init__(self, types: dict[str, MessgenType], type_name: str):
-        super().__init__(types, type_name)
+    def __init__(self, types: dict[str, MessgenType], type_name: str, converters: dict[str, TypeConverter] | None = None,
+                 options: CodecOptions | None = None):
+        super().__init__(types, type_name, converters, options)
         assert self._type_class == TypeClass.scalar
 
         try:
@@ -118,6 +581,7 @@ class ScalarConverter(TypeConverter):
         except KeyError:
             raise RuntimeError('Unsupported scalar type "%s"' % type_name)
 
+        self.flat_fmt = self.struct_fmt
         self.struct_fmt = "<" + self.struct_fmt
         self.size = struct.calcsize(self.struct_fmt)
         self.def_value: bool | float | int = 0
@@ -127,11 +591,33 @@ class ScalarConverter(TypeConverter):
         elif type_name == "float32" or type_name == "float64":
             self.def_value = 0.0
 
+    def _serialized_size(self, data) -> int:
+        return self.size
+
     def _serialize(self, data) -> bytes:
         return struct.pack(self.struct_fmt, data)
 
-    def _deserialize(self, data: memoryview):
-        return struct.unpack(self.struct_fmt, data[: self.size])[0], self.size
+    def _serialize_to(self, data, out: bytearray) -> None:
+        out += struct.pack(self.struct_fmt, data)
+
+    def _serialize_into(self, data, buf, offset: int) -> int:
+        struct.pack_into(self.struct_fmt, buf, offset, data)
+        return offset + self.size
+
+    def _deserialize_from(self, buf, offset: int):
+        return struct.unpack_from(self.struct_fmt, buf, offset)[0], offset + self.size
+
+    def _flatten(self, data, out: list) -> None:
+        out.append(data)
+
+    def _unflatten(self, values: tuple, idx: int):
+        return values[idx], idx + 1
+
+    def _emit_flatten(self, gen: _CodeGen, indent: int, expr: str, args: list[str]) -> None:
+        args.append(expr)
+
+    def _emit_unflatten(self, gen: _CodeGen, indent: int, values: str, idx: int) -> tuple[str, int]:
+        return f"{values}[{idx}]", idx + 1
 
     def default_value(self):
         return self.def_value
@@ -139,83 +625,110 @@ class ScalarConverter(TypeConverter):
 
 class DecimalConverter(TypeConverter):
     _MAX_COEFFICIENT = 10 ** 16 - 1
+    _MAX_DIGITS = 16
     _MAX_EXPONENT = 369
     _MIN_EXPONENT = -398
+    _SMALL_COEFFICIENT_MASK = (1 << 53) - 1
+    _LARGE_COEFFICIENT_MASK = (1 << 51) - 1
+
+    # Exponent reported by `batch_components` for NaN and infinities
+    SPECIAL_EXPONENT = 0x7FFF
 
-    def __init__(self, types: dict[str, MessgenType], type_name: str):
-        super().__init__(types, type_name)
+    _POW10 = [10 ** i for i in range(_MAX_DIGITS + 1)]
+    _STRIP_STEPS = (16, 8, 4, 2, 1)
+
+    # Decimals are built by scaling the coefficient, this context keeps it exact whatever the thread context is
+    _EXACT_CONTEXT = Context(prec=MAX_PREC, Emax=MAX_EMAX, Emin=MIN_EMIN)
+    _ZERO = Decimal((0, (0,), 0))
+    _INFINITY = Decimal("Infinity")
+    _NEG_INFINITY = Decimal("-Infinity")
+    _NAN = Decimal("NaN")
+
+    def __init__(self, types: dict[str, MessgenType], type_name: str, converters: dict[str, TypeConverter] | None = None,
+                 options: CodecOptions | None = None):
+        super().__init__(types, type_name, converters, options)
         assert self._type_class == TypeClass.decimal
         assert self._type_def.size == 8  # only dec64 is supported
 
         self.def_value: Decimal = Decimal("0")
         self.size = self._type_def.size
+        self.flat_fmt = "Q"
+        self.struct_fmt = "<" + self.flat_fmt
+        self._pow10_floats: typing.Any = None
+
+    def _serialized_size(self, data) -> int:
+        return self.size
 
     def _serialize(self, data) -> bytes:
+        return struct.pack(self.struct_fmt, self._to_bits(data))
+
+    def _serialize_into(self, data, buf, offset: int) -> int:
+        struct.pack_into(self.struct_fmt, buf, offset, self._to_bits(data))
+        return offset + self.size
+
+    def _deserialize_from(self, buf, offset: int) -> tuple[Decimal, int]:
+        return self._from_bits(struct.unpack_from(self.struct_fmt, buf, offset)[0]), offset + self.size
+
+    def _flatten(self, data, out: list) -> None:
+        out.append(self._to_bits(data))
+
+    def _unflatten(self, values: tuple, idx: int):
+        return self._from_bits(values[idx]), idx + 1
+
+    def _emit_flatten(self, gen: _CodeGen, indent: int, expr: str, args: list[str]) -> None:
+        args.append(f"{gen.const(self._to_bits)}({expr})")
+
+    def _emit_unflatten(self, gen: _CodeGen, indent: int, values: str, idx: int) -> tuple[str, int]:
+        return f"{gen.const(self._from_bits)}({values}[{idx}])", idx + 1
+
+    def _to_bits(self, data) -> int:
         if not isinstance(data, Decimal):
             raise MessgenError(f"Expected Decimal type, got {type(data)}")
 
         # Handle special values
-        if data.is_nan():
-            return int(0b11111 << 58).to_bytes(self.size, byteorder="little")
-
-        if data.is_infinite():
+        if not data.is_finite():
+            if data.is_nan():
+                return int(0b11111 << 58)
             sign_bit = 1 if data < 0 else 0
-            return ((sign_bit << 63) | (0b11110 << 58)).to_bytes(self.size, byteorder="little")
+            return (sign_bit << 63) | (0b11110 << 58)
 
-        # Extract components from Decimal
-        sign, digits, exponent = data.as_tuple()
+        # Extract components from Decimal, the coefficient is taken by exact scaling instead of walking the digits
+        sign, _, exponent = data.as_tuple()
         assert isinstance(exponent, int)
+        coefficient = abs(int(data.scaleb(-exponent, self._EXACT_CONTEXT)))
 
-        # Convert digits to coefficient
-        coefficient = 0
-        for digit in digits:
-            coefficient = coefficient * 10 + digit
-
-        # Normalize the coefficient
-        while coefficient != 0 and coefficient % 10 == 0 and exponent < self._MAX_EXPONENT:
-            coefficient //= 10
-            exponent += 1
+        # Normalize the coefficient, trailing zeros are stripped by decreasing powers of ten
+        if coefficient != 0 and coefficient % 10 == 0:
+            for step in self._STRIP_STEPS:
+                step_pow = self._POW10[step]
+                while exponent + step <= self._MAX_EXPONENT and coefficient % step_pow == 0:
+                    coefficient //= step_pow
+                    exponent += step
 
         # Normalize the exponent
-        while exponent > self._MAX_EXPONENT and coefficient * 10 <= self._MAX_COEFFICIENT:
-            coefficient *= 10
-            exponent -= 1
+        if exponent > self._MAX_EXPONENT:
+            if coefficient == 0:
+                exponent = self._MAX_EXPONENT
+            elif (shift := min(exponent - self._MAX_EXPONENT, self._MAX_DIGITS - bisect.bisect_right(self._POW10, coefficient))) > 0:
+                coefficient *= self._POW10[shift]
+                exponent -= shift
 
         # Check if dec64 is inifity
         if (sign == 0 and coefficient > self._MAX_COEFFICIENT) or exponent > self._MAX_EXPONENT:
-            return ((sign << 63) | (0b11110 << 58)).to_bytes(self.size, byteorder="little")
+            return (sign << 63) | (0b11110 << 58)
 
         # Check if dec64 trimms to zero
         if coefficient > self._MAX_COEFFICIENT or exponent < self._MIN_EXPONENT:
-            return int(sign << 63).to_bytes(self.size, byteorder="little")
-
-        # Store the sign
-        bits = sign
+            return int(sign << 63)
 
         # Determine encoding format based on coefficient size
-        if coefficient > ((1 << 53) - 1):
-            coefficient_bits = 51
-            bits <<= 2
-            bits |= 0b11  # Top 2 bits of combination field
-
-        else:
-            coefficient_bits = 53
-
-        # Apply exponent bias
-        bits <<= 10
-        bits |= exponent - self._MIN_EXPONENT
+        if coefficient > self._SMALL_COEFFICIENT_MASK:
+            return (((sign << 2) | 0b11) << 61) | ((exponent - self._MIN_EXPONENT) << 51) | (coefficient & self._LARGE_COEFFICIENT_MASK)
+        return (sign << 63) | ((exponent - self._MIN_EXPONENT) << 53) | coefficient
 
-        # Apply the coefficient
-        bits <<= coefficient_bits
-        bits |= coefficient & ((1 << coefficient_bits) - 1)
-
-        return bits.to_bytes(self.size, byteorder="little")
-
-    def _deserialize(self, data: memoryview) -> tuple[Decimal, int]:
-        # Convert bytes to 64-bit integer
-        bits = int.from_bytes(data[: self.size], byteorder="little")
+    def _from_bits(self, bits: int) -> Decimal:
         if bits == 0:
-            return Decimal((0, (0,), 0)), self.size
+            return self._ZERO
 
         # Extract sign bit (bit 63)
         sign = bits >> 63
@@ -226,45 +739,90 @@ class DecimalConverter(TypeConverter):
         # Check for special values (NaN, Infinity)
         if combination >= 0b11110:
             if combination == 0b11110:
-                return (Decimal("Infinity") if sign == 0 else Decimal("-Infinity")), self.size
+                return self._NEG_INFINITY if sign else self._INFINITY
             else:
-                return Decimal("NaN"), self.size
+                return self._NAN
 
-        # Extract exponent information
+        # Extract exponent and coefficient
         if (combination >> 3) == 0b11:  # If bits 62-61 are '11'
-            coefficient_bits = 51
-            coefficient_implicit_prefix = 0b100
+            exponent = ((bits >> 51) & 0x3FF) + self._MIN_EXPONENT
+            coefficient = (0b100 << 51) | (bits & self._LARGE_COEFFICIENT_MASK)
         else:  # All other combination field values
-            coefficient_bits = 53
-            coefficient_implicit_prefix = 0
-
-        exponent_mask = (1 << 10) - 1  # 10 bits
-        exponent = ((bits >> coefficient_bits) & exponent_mask) + self._MIN_EXPONENT
-
-        coefficient_mask = (1 << coefficient_bits) - 1
-        coefficient = (coefficient_implicit_prefix << coefficient_bits) | (bits & coefficient_mask)
+            exponent = ((bits >> 53) & 0x3FF) + self._MIN_EXPONENT
+            coefficient = bits & self._SMALL_COEFFICIENT_MASK
+
+        value = Decimal(coefficient).scaleb(exponent, self._EXACT_CONTEXT)
+        return value.copy_negate() if sign else value
+
+    def batch_components(self, data: typing.Any) -> tuple[typing.Any, typing.Any]:
+        """Decode many dec64 values into int64 numpy arrays of coefficients and exponents.
+
+        `data` is an array of raw dec64 bits, e.g. a column returned by `decode_batch`, or a
+        buffer of serialized values. The sign is carried by the coefficient. NaN and infinities
+        have a zero coefficient and `SPECIAL_EXPONENT`, use `batch_floats` to tell them apart.
+        """
+        bits = self._batch_bits(data)
+        coefficients, exponents, negative = self._batch_components(bits)
+        np.negative(coefficients, out=coefficients, where=negative)
+        special = ((bits >> 58) & 0b11111) >= 0b11110
+        coefficients[special] = 0
+        exponents[special] = self.SPECIAL_EXPONENT
+        return coefficients, exponents
+
+    def batch_floats(self, data: typing.Any) -> typing.Any:
+        """Decode many dec64 values into a float64 numpy array, `data` is as in `batch_components`."""
+        bits = self._batch_bits(data)
+        coefficients, exponents, negative = self._batch_components(bits)
+
+        # Negative exponents divide by exact powers of ten, split in two steps to stay in the float range
+        pow10 = self._batch_pow10()
+        first = np.minimum(np.maximum(-exponents, 0), 300)
+        with np.errstate(over="ignore", invalid="ignore"):
+            out = coefficients.astype(np.float64) * pow10[np.maximum(exponents, 0)] / pow10[first] / pow10[np.maximum(-exponents - first, 0)]
+        # Zeros with large exponents would be 0 * inf
+        out[coefficients == 0] = 0.0
+        np.negative(out, out=out, where=negative)
 
-        return Decimal((sign, self._digits_of(coefficient), exponent)), self.size
-
-    @staticmethod
-    def _digits_of(n) -> tuple:
-        if n == 0:
-            return (0,)
-
-        result = []
-        while n > 0:
-            n, remainder = divmod(n, 10)
-            result.append(remainder)
+        combination = (bits >> 58) & 0b11111
+        out[combination == 0b11111] = np.nan
+        infinity = combination == 0b11110
+        out[infinity] = np.where(negative[infinity], -np.inf, np.inf)
+        return out
 
-        return tuple(reversed(result))
+    def _batch_components(self, bits) -> tuple[typing.Any, typing.Any, typing.Any]:
+        # Returns absolute coefficients, exponents and the sign mask
+        large = (bits >> 61) & 0b11 == 0b11
+        exponents = np.where(large, (bits >> 51) & 0x3FF, (bits >> 53) & 0x3FF).astype(np.int64) + self._MIN_EXPONENT
+        coefficients = np.where(
+            large,
+            (bits & self._LARGE_COEFFICIENT_MASK) | (0b100 << 51),
+            bits & self._SMALL_COEFFICIENT_MASK,
+        ).astype(np.int64)
+        exponents[bits == 0] = 0
+        return coefficients, exponents, (bits >> 63) == 1
+
+    def _batch_bits(self, data) -> typing.Any:
+        if np is None:
+            raise MessgenError("numpy is required for batch decoding of decimals")
+        if isinstance(data, np.ndarray):
+            return data.astype(np.uint64, copy=False).reshape(-1)
+        return np.frombuffer(data, "<u8").astype(np.uint64, copy=False)
+
+    def _batch_pow10(self) -> typing.Any:
+        if self._pow10_floats is None:
+            # Exponents are encoded in 10 bits, so they never exceed 1023 + _MIN_EXPONENT
+            with np.errstate(over="ignore"):
+                self._pow10_floats = np.power(10.0, np.arange(1024 + self._MIN_EXPONENT))
+        return self._pow10_floats
 
     def default_value(self):
         return self.def_value
 
 
 class EnumConverter(TypeConverter):
-    def __init__(self, types: dict[str, MessgenType], type_name: str):
-        super().__init__(types, type_name)
+    def __init__(self, types: dict[str, MessgenType], type_name: str, converters: dict[str, TypeConverter] | None = None,
+                 options: CodecOptions | None = None):
+        super().__init__(types, type_name, converters, options)
         assert self._type_class == TypeClass.enum
         assert isinstance(self._type_def, EnumType)
         self.base_type = self._type_def.base_type
@@ -273,6 +831,7 @@ class EnumConverter(TypeConverter):
             self.struct_fmt = STRUCT_TYPES_MAP[self.base_type]
         except KeyError:
             raise RuntimeError('Unsupported base type "%s" in %s' % (self.base_type, type_name))
+        self.flat_fmt = self.struct_fmt
         self.struct_fmt = "<" + self.struct_fmt
 
         self.size = struct.calcsize(self.struct_fmt)
@@ -283,24 +842,112 @@ class EnumConverter(TypeConverter):
             self.mapping[value] = item.name
             self.rev_mapping[item.name] = value
 
+        self.enum_mode = self._options.enum_mode
+        self.int_enum: type[enum.IntEnum] | None = None
+        if self.enum_mode == "int_enum":
+            try:
+                self.int_enum = enum.IntEnum(type_name.split("/")[-1], list(self.rev_mapping.items()))  # type: ignore[misc]
+            except (TypeError, ValueError) as e:
+                raise MessgenError(f"Unsupported enum={type_name} for enum_mode=int_enum error=\"{e}\"") from e
+            # Some reserved names, like _missing_, are silently taken as enum attributes instead of members
+            if invalid_names := [name for name in self.rev_mapping if name not in self.int_enum.__members__]:
+                raise MessgenError(f"Unsupported enum={type_name} for enum_mode=int_enum items={invalid_names}")
+
+        # Decoded objects by raw value, and encoded values by name or value, members of `int_enum` compare equal to their values
+        self._decoded: dict[int, typing.Any] = dict(self.mapping)
+        if self.int_enum is not None:
+            self._decoded = {value: self.int_enum(value) for value in self.mapping}
+        self._values: dict[typing.Any, int] = {**self.rev_mapping, **{value: value for value in self.mapping}}
+
+        # Serialized bytes of every valid value, values not fitting the base type fail on encoding
+        self._packed: dict[typing.Any, bytes] = {}
+        for key, value in self._values.items():
+            try:
+                self._packed[key] = struct.pack(self.struct_fmt, value)
+            except struct.error:
+                pass
+
+        # Single byte enums are decoded by indexing a table with the raw byte
+        self._byte_table: list[typing.Any] | None = None
+        if self.size == 1:
+            self._byte_table = [self._decoded.get(struct.unpack(self.struct_fmt, bytes((b,)))[0]) for b in range(256)]
+
+    def _serialized_size(self, data) -> int:
+        return self.size
+
     def _serialize(self, data) -> bytes:
-        if (v := self.rev_mapping.get(data)) is not None:
-            return struct.pack(self.struct_fmt, v)
+        if (packed := self._packed.get(data)) is not None:
+            return packed
+        return struct.pack(self.struct_fmt, self._to_value(data))
+
+    def _serialize_into(self, data, buf, offset: int) -> int:
+        struct.pack_into(self.struct_fmt, buf, offset, self._to_value(data))
+        return offset + self.size
+
+    def _deserialize_from(self, buf, offset: int):
+        if self._byte_table is not None and (decoded := self._byte_table[buf[offset]]) is not None:
+            return decoded, offset + 1
+        (v,) = struct.unpack_from(self.struct_fmt, buf, offset)
+        return self._from_value(v), offset + self.size
+
+    def _flatten(self, data, out: list) -> None:
+        out.append(self._to_value(data))
+
+    def _unflatten(self, values: tuple, idx: int):
+        return self._from_value(values[idx]), idx + 1
+
+    def _emit_deserialize(self, gen: _CodeGen, indent: int) -> str:
+        if self._byte_table is None:
+            return super()._emit_deserialize(gen, indent)
+
+        value = gen.var()
+        gen.emit(indent, f"{value} = {gen.const(self._byte_table)}[buf[off]]")
+        gen.emit(indent, f"if {value} is None:")
+        gen.emit(indent + 1, f"{value}, _ = {gen.const(self._deserialize_from)}(buf, off)")
+        gen.emit(indent, "off += 1")
+        return value
+
+    def _emit_serialize(self, gen: _CodeGen, indent: int, expr: str) -> None:
+        value = gen.var()
+        gen.emit(indent, f"{value} = {gen.const(self._packed)}.get({expr})")
+        gen.emit(indent, f"if {value} is None:")
+        gen.emit(indent + 1, f"{value} = {gen.const(self._serialize)}({expr})")
+        gen.emit(indent, f"out_append({value})")
+
+    def _emit_flatten(self, gen: _CodeGen, indent: int, expr: str, args: list[str]) -> None:
+        value = gen.var()
+        gen.emit(indent, f"{value} = {gen.const(self._values)}.get({expr})")
+        gen.emit(indent, f"if {value} is None:")
+        gen.emit(indent + 1, f"{value} = {gen.const(self._to_value)}({expr})")
+        args.append(value)
+
+    def _emit_unflatten(self, gen: _CodeGen, indent: int, values: str, idx: int) -> tuple[str, int]:
+        value = gen.var()
+        gen.emit(indent, f"{value} = {gen.const(self._decoded)}.get({values}[{idx}])")
+        gen.emit(indent, f"if {value} is None:")
+        gen.emit(indent + 1, f"{value} = {gen.const(self._from_value)}({values}[{idx}])")
+        return value, idx + 1
+
+    def _to_value(self, data) -> int:
+        if (v := self._values.get(data)) is not None:
+            return v
         raise MessgenError(f"Unsupported value={data} for enum={self._type_name}")
 
-    def _deserialize(self, data: memoryview):
-        (v,) = struct.unpack(self.struct_fmt, data[: self.size])
-        if (mapped := self.mapping.get(v)) is not None:
-            return mapped, self.size
+    def _from_value(self, v: int) -> typing.Any:
+        if (decoded := self._decoded.get(v)) is not None:
+            return decoded
         raise MessgenError(f"Unsupported enum={self._type_name} value={v}")
 
     def default_value(self):
         assert isinstance(self._type_def, EnumType)
+        if self.int_enum is not None:
+            return self.int_enum[self._type_def.values[0].name]
         return self._type_def.values[0].name
 
 class BitsetConverter(TypeConverter):
-    def __init__(self, types: dict[str, MessgenType], type_name: str):
-        super().__init__(types, type_name)
+    def __init__(self, types: dict[str, MessgenType], type_name: str, converters: dict[str, TypeConverter] | None = None,
+                 options: CodecOptions | None = None):
+        super().__init__(types, type_name, converters, options)
         assert self._type_class == TypeClass.bitset
         assert isinstance(self._type_def, BitsetType)
         self.base_type = self._type_def.base_type
@@ -309,6 +956,7 @@ class BitsetConverter(TypeConverter):
             self.struct_fmt = STRUCT_TYPES_MAP[self.base_type]
         except KeyError:
             raise RuntimeError('Unsupported base type "%s" in %s' % (self.base_type, type_name))
+        self.flat_fmt = self.struct_fmt
         self.struct_fmt = "<" + self.struct_fmt
 
         self.size = struct.calcsize(self.struct_fmt)
@@ -320,8 +968,52 @@ class BitsetConverter(TypeConverter):
         for item in self._type_def.bits:
             self.mapping[item.offset] = item.name
             self.rev_mapping[item.name] = item.offset
+        self._bit_masks = {name: 1 << offs for name, offs in self.rev_mapping.items()}
+        self._value_mask = (1 << (self.size * 8)) - 1
+
+        # Names of the set bits for every value of every byte of the bitset
+        self._byte_tables = [
+            [tuple(self.mapping[byte_idx * 8 + b] for b in range(8) if value & (1 << b)) for value in range(256)]
+            for byte_idx in range(self.size)
+        ]
+
+        self._frozensets: dict[int, frozenset[str]] = {}
+        self.bitset_mode = self._options.bitset_mode
+        self._decode_value: typing.Callable[[int], typing.Any] = self._from_value
+        if self.bitset_mode == "int":
+            self._decode_value = int
+        elif self.bitset_mode == "frozenset":
+            self._decode_value = self._frozenset_of
+
+    def _serialized_size(self, data) -> int:
+        return self.size
 
     def _serialize(self, data) -> bytes:
+        return struct.pack(self.struct_fmt, self._to_value(data))
+
+    def _serialize_into(self, data, buf, offset: int) -> int:
+        struct.pack_into(self.struct_fmt, buf, offset, self._to_value(data))
+        return offset + self.size
+
+    def _deserialize_from(self, buf, offset: int):
+        (v,) = struct.unpack_from(self.struct_fmt, buf, offset)
+        return self._decode_value(v), offset + self.size
+
+    def _flatten(self, data, out: list) -> None:
+        out.append(self._to_value(data))
+
+    def _unflatten(self, values: tuple, idx: int):
+        return self._decode_value(values[idx]), idx + 1
+
+    def _emit_flatten(self, gen: _CodeGen, indent: int, expr: str, args: list[str]) -> None:
+        args.append(f"{gen.const(self._to_value)}({expr})")
+
+    def _emit_unflatten(self, gen: _CodeGen, indent: int, values: str, idx: int) -> tuple[str, int]:
+        if self.bitset_mode == "int":
+            return f"{values}[{idx}]", idx + 1
+        return f"{gen.const(self._decode_value)}({values}[{idx}])", idx + 1
+
+    def _to_value(self, data) -> int:
         v = 0
         if isinstance(data, int):
             # Bitset as number
@@ -329,78 +1021,460 @@ class BitsetConverter(TypeConverter):
         else:
             # Bitset as collection of bit names
             for b in data:
-                if (offs := self.rev_mapping.get(b)) is not None:
-                    v |= (1 << offs)
+                if (mask := self._bit_masks.get(b)) is not None:
+                    v |= mask
                 else:
                     raise MessgenError(f"Unsupported bit={b} for bitset={self._type_name}")
-
-        return struct.pack(self.struct_fmt, v)
-
-    def _deserialize(self, data):
-        (v,) = struct.unpack(self.struct_fmt, data[: self.size])
-
-        bits = list()
-        for offs in range(len(self.mapping)):
-            if v & (1 << offs):
-                bits.append(self.mapping[offs])
-        return bits, self.size
+        return v
+
+    def _from_value(self, v: int) -> list[str]:
+        v &= self._value_mask
+        if v < 256:
+            return list(self._byte_tables[0][v])
+
+        bits: list[str] = []
+        for table in self._byte_tables:
+            if v & 0xFF:
+                bits.extend(table[v & 0xFF])
+            v >>= 8
+            if not v:
+                break
+        return bits
+
+    def _frozenset_of(self, v: int) -> frozenset[str]:
+        if (bits := self._frozensets.get(v)) is None:
+            bits = frozenset(self._from_value(v))
+            # Bitsets usually take few distinct values, the cache is bounded for the ones that don't
+            if len(self._frozensets) < 4096:
+                self._frozensets[v] = bits
+        return bits
 
     def default_value(self):
+        if self.bitset_mode == "int":
+            return 0
+        if self.bitset_mode == "frozenset":
+            return frozenset()
         return set()
 
 class StructConverter(TypeConverter):
-    def __init__(self, types: dict[str, MessgenType], type_name: str):
-        super().__init__(types, type_name)
+    def __init__(self, types: dict[str, MessgenType], type_name: str, converters: dict[str, TypeConverter] | None = None,
+                 options: CodecOptions | None = None):
+        super().__init__(types, type_name, converters, options)
         assert self._type_class == TypeClass.struct
         assert isinstance(self._type_def, StructType)
-        self.fields = [(field.name, create_type_converter(types, field.type)) for field in self._type_def.fields]
+        self.fields = [(field.name, self._create_converter(field.type)) for field in self._type_def.fields]
+        self.field_names = [field_name for field_name, _ in self.fields]
+        self.field_index = {field_name: i for i, field_name in enumerate(self.field_names)}
+
+        # Offsets of the fixed-size fields prefix, including the first variable size field
+        self.prefix_offsets = [0]
+        for _, field_type in self.fields[:-1]:
+            if (field_size := field_type.type_definition().size) is None:
+                break
+            self.prefix_offsets.append(self.prefix_offsets[-1] + field_size)
+
+        self._projections: dict[tuple[str, ...], Projection] = {}
+
+        self.record_class: type[Record] | None = None
+        if self._options.records:
+            self.record_class = _make_record_class(type_name, self.field_names)
+
+        # Fixed-size structs built only of flat fields are packed with one precompiled struct
+        self.flat_struct: struct.Struct | None = None
+        self.flat_scalars = False
+        if self._type_def.size is not None and all(field_type.flat_fmt is not None for _, field_type in self.fields):
+            self.flat_fmt = "".join(typing.cast(str, field_type.flat_fmt) for _, field_type in self.fields)
+            self.flat_struct = struct.Struct("<" + self.flat_fmt)
+            self.flat_scalars = all(isinstance(field_type, ScalarConverter) for _, field_type in self.fields)
+            assert self.flat_struct.size == self._type_def.size
+
+        self.iov_passthrough = any(field_type.iov_passthrough for _, field_type in self.fields)
+
+    def _serialized_size(self, data) -> int:
+        if (size := self._type_def.size) is not None:
+            return size
+
+        size = 0
+        for field_name, field_type in self.fields:
+            v = data.get(field_name, None)
+            if v is None:
+                size += len(field_type.default_bytes())
+            else:
+                size += field_type._serialized_size(v)
+        return size
 
     def _serialize(self, data) -> bytes:
-        out = []
+        if self.flat_struct is not None:
+            values: list = []
+            self._flatten(data, values)
+            return self.flat_struct.pack(*values)
+        if self._type_def.size is not None:
+            return super()._serialize(data)
+
+        out = bytearray()
+        self._serialize_to(data, out)
+        return bytes(out)
+
+    def _serialize_to(self, data, out: bytearray) -> None:
+        if self._type_def.size is not None:
+            out += self._serialize(data)
+            return
+
+        for field_name, field_type in self.fields:
+            v = data.get(field_name, None)
+            if v is None:
+                out += field_type.default_bytes()
+            else:
+                field_type._serialize_to(v, out)
+
+    def _serialize_into(self, data, buf, offset: int) -> int:
+        if self.flat_struct is not None:
+            out: list = []
+            self._flatten(data, out)
+            self.flat_struct.pack_into(buf, offset, *out)
+            return offset + self.flat_struct.size
+
         for field_name, field_type in self.fields:
             v = data.get(field_name, None)
             if v is None:
-                v = field_type.default_value()
-            out.append(field_type._serialize(v))
-        return b"".join(out)
+                default = field_type.default_bytes()
+                end = offset + len(default)
+                if end > len(buf):
+                    raise struct.error(f"pack_into requires a buffer of at least {end} bytes")
+                buf[offset:end] = default
+                offset = end
+            else:
+                offset = field_type._serialize_into(v, buf, offset)
+        return offset
+
+    def _variable_size_bounds(self) -> tuple[int, int | None]:
+        max_sizes = [field_type.max_size() for _, field_type in self.fields]
+        max_size = None if None in max_sizes else sum(typing.cast(list[int], max_sizes))
+        return sum(field_type.min_size() for _, field_type in self.fields), max_size
+
+    def _serialize_iov(self, data, writer: _IovWriter) -> None:
+        if not self.iov_passthrough:
+            return super()._serialize_iov(data, writer)
+
+        for field_name, field_type in self.fields:
+            v = data.get(field_name, None)
+            if v is None:
+                writer.write(field_type.default_bytes())
+            else:
+                field_type._serialize_iov(v, writer)
+
+    def _deserialize_from(self, buf, offset: int):
+        if self.flat_struct is not None:
+            values = self.flat_struct.unpack_from(buf, offset)
+            if self.flat_scalars:
+                if self.record_class is not None:
+                    return self.record_class(*values), offset + self.flat_struct.size
+                return dict(zip(self.field_names, values)), offset + self.flat_struct.size
+            return self._unflatten(values, 0)[0], offset + self.flat_struct.size
+
+        if self.record_class is not None:
+            items = []
+            for _, field_type in self.fields:
+                value, offset = field_type._deserialize_from(buf, offset)
+                items.append(value)
+            return self.record_class(*items), offset
 
-    def _deserialize(self, data: memoryview):
         out = {}
-        offset = 0
         for field_name, field_type in self.fields:
-            value, size = field_type._deserialize(data[offset:])
-            out[field_name] = value
-            offset += size
+            out[field_name], offset = field_type._deserialize_from(buf, offset)
         return out, offset
 
+    def projection(self, fields: typing.Sequence[str]) -> "Projection":
+        """Return a decoder of only the given `fields`, nested struct fields are selected with dotted paths like "a.b"."""
+        key = tuple(fields)
+        if (projection := self._projections.get(key)) is None:
+            projection = Projection(self, key)
+            self._projections[key] = projection
+        return projection
+
+    def _view_from(self, buf: memoryview, offset: int) -> "StructView":
+        return StructView(self, buf, offset)
+
+    def _skip(self, buf: memoryview, offset: int) -> int:
+        if (size := self._type_def.size) is not None:
+            return offset + size
+        for _, field_type in self.fields:
+            offset = field_type._skip(buf, offset)
+        return offset
+
+    def _flatten(self, data, out: list) -> None:
+        for field_name, field_type in self.fields:
+            v = data.get(field_name, None)
+            if v is None:
+                out.extend(field_type._default_flat_values())
+            else:
+                field_type._flatten(v, out)
+
+    def _unflatten(self, values: tuple, idx: int):
+        if self.flat_scalars:
+            end = idx + len(self.fields)
+            if self.record_class is not None:
+                return self.record_class(*values[idx:end]), end
+            return dict(zip(self.field_names, values[idx:end])), end
+
+        if self.record_class is not None:
+            items = []
+            for _, field_type in self.fields:
+                value, idx = field_type._unflatten(values, idx)
+                items.append(value)
+            return self.record_class(*items), idx
+
+        out = {}
+        for field_name, field_type in self.fields:
+            out[field_name], idx = field_type._unflatten(values, idx)
+        return out, idx
+
+    def _flat_groups(self) -> list[tuple[str | None, list[tuple[str, TypeConverter]]]]:
+        # Split fields into runs of consecutive flat fields, that can share one struct, and single other fields
+        groups: list[tuple[str | None, list[tuple[str, TypeConverter]]]] = []
+        for field_name, field_type in self.fields:
+            if field_type.flat_fmt is None:
+                groups.append((None, [(field_name, field_type)]))
+            elif groups and (fmt := groups[-1][0]) is not None:
+                groups[-1] = (fmt + field_type.flat_fmt, groups[-1][1] + [(field_name, field_type)])
+            else:
+                groups.append((field_type.flat_fmt, [(field_name, field_type)]))
+        return groups
+
+    def _emit_field_value(self, gen: _CodeGen, indent: int, expr: str, field_name: str, field_type: TypeConverter) -> str:
+        value = gen.var()
+        gen.emit(indent, f"{value} = {expr}.get({field_name!r})")
+        gen.emit(indent, f"if {value} is None:")
+        gen.emit(indent + 1, f"{value} = {gen.const(field_type)}.default_value()")
+        return value
+
+    def _emit_deserialize(self, gen: _CodeGen, indent: int) -> str:
+        if self.flat_struct is not None:
+            return super()._emit_deserialize(gen, indent)
+
+        items = []
+        for fmt, fields in self._flat_groups():
+            if fmt is None:
+                field_name, field_type = fields[0]
+                items.append((field_name, field_type._emit_deserialize(gen, indent)))
+                continue
+
+            values = gen.var("t")
+            struct_name, size = gen.struct(fmt)
+            gen.emit(indent, f"{values} = {struct_name}.unpack_from(buf, off)")
+            gen.emit(indent, f"off += {size}")
+            idx = 0
+            for field_name, field_type in fields:
+                expr, idx = field_type._emit_unflatten(gen, indent, values, idx)
+                items.append((field_name, expr))
+
+        value = gen.var()
+        gen.emit(indent, f"{value} = {self._emit_value(gen, items)}")
+        return value
+
+    def _emit_serialize(self, gen: _CodeGen, indent: int, expr: str) -> None:
+        if self.flat_struct is not None:
+            return super()._emit_serialize(gen, indent, expr)
+
+        for fmt, fields in self._flat_groups():
+            if fmt is None:
+                field_name, field_type = fields[0]
+                value = gen.var()
+                gen.emit(indent, f"{value} = {expr}.get({field_name!r})")
+                gen.emit(indent, f"if {value} is None:")
+                # Defaults are looked up when a field is missing, external types have none
+                gen.emit(indent + 1, f"out_append({gen.const(field_type)}.default_bytes())")
+                gen.emit(indent, "else:")
+                field_type._emit_serialize(gen, indent + 1, value)
+                continue
+
+            args: list[str] = []
+            for field_name, field_type in fields:
+                field_type._emit_flatten(gen, indent, self._emit_field_value(gen, indent, expr, field_name, field_type), args)
+            gen.emit(indent, f"out_append({gen.struct(fmt)[0]}.pack({', '.join(args)}))")
+
+    def _emit_flatten(self, gen: _CodeGen, indent: int, expr: str, args: list[str]) -> None:
+        for field_name, field_type in self.fields:
+            field_type._emit_flatten(gen, indent, self._emit_field_value(gen, indent, expr, field_name, field_type), args)
+
+    def _emit_unflatten(self, gen: _CodeGen, indent: int, values: str, idx: int) -> tuple[str, int]:
+        items = []
+        for field_name, field_type in self.fields:
+            expr, idx = field_type._emit_unflatten(gen, indent, values, idx)
+            items.append((field_name, expr))
+        return self._emit_value(gen, items), idx
+
+    def _emit_value(self, gen: _CodeGen, items: list[tuple[str, str]]) -> str:
+        if self.record_class is not None:
+            return f"{gen.const(self.record_class)}({', '.join(expr for _, expr in items)})"
+        return f"{{{', '.join(f'{field_name!r}: {expr}' for field_name, expr in items)}}}"
+
+    def _batch_dtype(self):
+        if self._type_def.size is None:
+            return None
+        fields = [(field_name, field_type._batch_dtype()) for field_name, field_type in self.fields]
+        if any(field_dtype is None for _, field_dtype in fields):
+            return None
+        return np.dtype(fields)
+
     def default_value(self):
+        if self.record_class is not None:
+            return self.record_class(*(field_type.default_value() for _, field_type in self.fields))
         return {field_name: field_type.default_value() for field_name, field_type in self.fields}
 
 
 class ArrayConverter(TypeConverter):
-    def __init__(self, types: dict[str, MessgenType], type_name: str):
-        super().__init__(types, type_name)
+    def __init__(self, types: dict[str, MessgenType], type_name: str, converters: dict[str, TypeConverter] | None = None,
+                 options: CodecOptions | None = None):
+        super().__init__(types, type_name, converters, options)
         assert self._type_class == TypeClass.array
         assert isinstance(self._type_def, ArrayType)
-        self.element_type = create_type_converter(types, self._type_def.element_type)
+        self.element_type = self._create_converter(self._type_def.element_type)
         self.array_size = self._type_def.array_size
 
-    def _serialize(self, data) -> bytes:
-        out = []
+        # ndarray fields are kept out of the flat struct layout to be decoded as views
+        self.np_dtype = self._numpy_dtype(self.element_type)
+        if self.np_dtype is None and self.element_type.flat_fmt is not None:
+            if len(self.element_type.flat_fmt) == 1:
+                self.flat_fmt = f"{self.array_size}{self.element_type.flat_fmt}"
+            else:
+                self.flat_fmt = self.element_type.flat_fmt * self.array_size
+        self.flat_scalars = self.flat_fmt is not None and isinstance(self.element_type, ScalarConverter)
+        self.iov_passthrough = self.np_dtype is not None or self.element_type.iov_passthrough
+
+    def _serialized_size(self, data) -> int:
+        if (size := self._type_def.size) is not None:
+            return size
+        return sum(self.element_type._serialized_size(item) for item in data)
+
+    def _serialize_into(self, data, buf, offset: int) -> int:
+        assert len(data) == self.array_size
+        if self.np_dtype is not None and isinstance(data, np.ndarray):
+            return self._serialize_ndarray_into(data, self.np_dtype, buf, offset)
+
+        if self.flat_scalars:
+            struct.pack_into("<" + typing.cast(str, self.flat_fmt), buf, offset, *data)
+            return offset + typing.cast(int, self._type_def.size)
+
+        for item in data:
+            offset = self.element_type._serialize_into(item, buf, offset)
+        return offset
+
+    def _serialize_to(self, data, out: bytearray) -> None:
+        if self._type_def.size is not None:
+            out += self._serialize(data)
+            return
+
         assert len(data) == self.array_size
         for item in data:
-            out.append(self.element_type._serialize(item))
-        return b"".join(out)
+            self.element_type._serialize_to(item, out)
+
+    def _variable_size_bounds(self) -> tuple[int, int | None]:
+        max_size = self.element_type.max_size()
+        return self.array_size * self.element_type.min_size(), None if max_size is None else self.array_size * max_size
+
+    def _serialize_iov(self, data, writer: _IovWriter) -> None:
+        if self.np_dtype is not None and isinstance(data, np.ndarray):
+            data = self._ndarray_elements(data, self.np_dtype)
+            assert len(data) == self.array_size
+            return writer.write_buffer(data)
+        if not self.element_type.iov_passthrough:
+            return super()._serialize_iov(data, writer)
+
+        assert len(data) == self.array_size
+        for item in data:
+            self.element_type._serialize_iov(item, writer)
+
+    def _deserialize_from(self, buf, offset: int):
+        if self.np_dtype is not None:
+            value = np.frombuffer(buf, self.np_dtype, self.array_size, offset)
+            return value, offset + value.nbytes
+
+        if self.flat_scalars:
+            return list(struct.unpack_from("<" + typing.cast(str, self.flat_fmt), buf, offset)), offset + typing.cast(int, self._type_def.size)
 
-    def _deserialize(self, data: memoryview):
         out = []
-        offset = 0
-        for i in range(self.array_size):
-            value, size = self.element_type._deserialize(data[offset:])
+        for _ in range(self.array_size):
+            value, offset = self.element_type._deserialize_from(buf, offset)
             out.append(value)
-            offset += size
         return out, offset
 
+    def _view_from(self, buf: memoryview, offset: int):
+        if self.np_dtype is not None or isinstance(self.element_type, ScalarConverter):
+            return self._deserialize_from(buf, offset)[0]
+        return SequenceView(self.element_type, buf, offset, self.array_size)
+
+    def _skip(self, buf: memoryview, offset: int) -> int:
+        if (size := self._type_def.size) is not None:
+            return offset + size
+        for _ in range(self.array_size):
+            offset = self.element_type._skip(buf, offset)
+        return offset
+
+    def _flatten(self, data, out: list) -> None:
+        assert len(data) == self.array_size
+        if self.flat_scalars:
+            out.extend(data)
+            return
+        for item in data:
+            self.element_type._flatten(item, out)
+
+    def _unflatten(self, values: tuple, idx: int):
+        if self.flat_scalars:
+            end = idx + self.array_size
+            return list(values[idx:end]), end
+
+        out = []
+        for _ in range(self.array_size):
+            value, idx = self.element_type._unflatten(values, idx)
+            out.append(value)
+        return out, idx
+
+    def _emit_deserialize(self, gen: _CodeGen, indent: int) -> str:
+        if self.flat_fmt is not None or self.np_dtype is not None:
+            return super()._emit_deserialize(gen, indent)
+
+        value = gen.var()
+        gen.emit(indent, f"{value} = []")
+        gen.emit(indent, f"for _ in range({self.array_size}):")
+        item = self.element_type._emit_deserialize(gen, indent + 1)
+        gen.emit(indent + 1, f"{value}.append({item})")
+        return value
+
+    def _emit_serialize(self, gen: _CodeGen, indent: int, expr: str) -> None:
+        if self.flat_fmt is not None or self.np_dtype is not None:
+            return super()._emit_serialize(gen, indent, expr)
+
+        item = gen.var()
+        gen.emit(indent, f"assert len({expr}) == {self.array_size}")
+        gen.emit(indent, f"for {item} in {expr}:")
+        self.element_type._emit_serialize(gen, indent + 1, item)
+
+    def _emit_flatten(self, gen: _CodeGen, indent: int, expr: str, args: list[str]) -> None:
+        gen.emit(indent, f"assert len({expr}) == {self.array_size}")
+        if self.flat_scalars:
+            args.append(f"*{expr}")
+            return
+        for i in range(self.array_size):
+            item = gen.var()
+            gen.emit(indent, f"{item} = {expr}[{i}]")
+            self.element_type._emit_flatten(gen, indent, item, args)
+
+    def _emit_unflatten(self, gen: _CodeGen, indent: int, values: str, idx: int) -> tuple[str, int]:
+        if self.flat_scalars:
+            return f"list({values}[{idx}:{idx + self.array_size}])", idx + self.array_size
+
+        items = []
+        for _ in range(self.array_size):
+            expr, idx = self.element_type._emit_unflatten(gen, indent, values, idx)
+            items.append(expr)
+        return f"[{', '.join(items)}]", idx
+
+    def _batch_dtype(self):
+        if (element_dtype := self.element_type._batch_dtype()) is None:
+            return None
+        return np.dtype((element_dtype, (self.array_size,)))
+
     def default_value(self):
         out = []
         for _ in range(self.array_size):
@@ -409,155 +1483,565 @@ class ArrayConverter(TypeConverter):
 
 
 class VectorConverter(TypeConverter):
-    def __init__(self, types: dict[str, MessgenType], type_name: str):
-        super().__init__(types, type_name)
+    def __init__(self, types: dict[str, MessgenType], type_name: str, converters: dict[str, TypeConverter] | None = None,
+                 options: CodecOptions | None = None):
+        super().__init__(types, type_name, converters, options)
         assert self._type_class == TypeClass.vector
         assert isinstance(self._type_def, VectorType)
-        self.size_type = create_type_converter(types, "uint32")
-        self.element_type = create_type_converter(types, self._type_def.element_type)
+        self.size_type = typing.cast(ScalarConverter, self._create_converter(SIZE_TYPE))
+        self.element_type = self._create_converter(self._type_def.element_type)
+        self.np_dtype = self._numpy_dtype(self.element_type)
+        self.iov_passthrough = self.np_dtype is not None or self.element_type.iov_passthrough
 
-    def _serialize(self, data) -> bytes:
-        out = []
-        out.append(self.size_type._serialize(len(data)))
+    def _serialized_size(self, data) -> int:
+        if (size := self.element_type.type_definition().size) is not None:
+            return self.size_type.size + size * len(data)
+        return self.size_type.size + sum(self.element_type._serialized_size(item) for item in data)
+
+    def _serialize_into(self, data, buf, offset: int) -> int:
+        if self.np_dtype is not None and isinstance(data, np.ndarray):
+            data = self._ndarray_elements(data, self.np_dtype)
+            offset = self.size_type._serialize_into(len(data), buf, offset)
+            return self._serialize_ndarray_into(data, self.np_dtype, buf, offset)
+
+        n = len(data)
 
+        if isinstance(element_type := self.element_type, ScalarConverter):
+            struct.pack_into("<%s%d%s" % (self.size_type.flat_fmt, n, element_type.flat_fmt), buf, offset, n, *data)
+            return offset + self.size_type.size + n * element_type.size
+
+        offset = self.size_type._serialize_into(n, buf, offset)
+        for item in data:
+            offset = self.element_type._serialize_into(item, buf, offset)
+        return offset
+
+    def _serialize_to(self, data, out: bytearray) -> None:
+        n = len(data)
+        if isinstance(element_type := self.element_type, ScalarConverter) and not (self.np_dtype is not None and isinstance(data, np.ndarray)):
+            out += struct.pack("<%s%d%s" % (self.size_type.flat_fmt, n, element_type.flat_fmt), n, *data)
+        elif self.np_dtype is not None and isinstance(data, np.ndarray) or element_type.type_definition().size is not None:
+            # Elements of a fixed size are packed into space reserved at once
+            offset = len(out)
+            out += bytes(self._serialized_size(data))
+            self._serialize_into(data, out, offset)
+        else:
+            out += self.size_type._serialize(n)
+            for item in data:
+                element_type._serialize_to(item, out)
+
+    def _variable_size_bounds(self) -> tuple[int, int | None]:
+        return self.size_type.size, None
+
+    def _serialize_iov(self, data, writer: _IovWriter) -> None:
+        if self.np_dtype is not None and isinstance(data, np.ndarray):
+            data = self._ndarray_elements(data, self.np_dtype)
+            writer.write(self.size_type._serialize(len(data)))
+            return writer.write_buffer(data)
+        if not self.element_type.iov_passthrough:
+            return super()._serialize_iov(data, writer)
+
+        writer.write(self.size_type._serialize(len(data)))
         for item in data:
-            out.append(self.element_type._serialize(item))
-        return b"".join(out)
+            self.element_type._serialize_iov(item, writer)
+
+    def _deserialize_from(self, buf, offset: int):
+        n, offset = self.size_type._deserialize_from(buf, offset)
+        if self.np_dtype is not None:
+            value = np.frombuffer(buf, self.np_dtype, n, offset)
+            return value, offset + value.nbytes
+
+        if isinstance(element_type := self.element_type, ScalarConverter):
+            return list(struct.unpack_from("<%d%s" % (n, element_type.flat_fmt), buf, offset)), offset + n * element_type.size
 
-    def _deserialize(self, data: memoryview):
         out = []
-        offset = 0
-        n, n_size = self.size_type._deserialize(data[offset:])
-        offset += n_size
-        for i in range(n):
-            value, n = self.element_type._deserialize(data[offset:])
+        for _ in range(n):
+            value, offset = element_type._deserialize_from(buf, offset)
             out.append(value)
-            offset += n
         return out, offset
 
+    def _view_from(self, buf: memoryview, offset: int):
+        if self.np_dtype is not None or isinstance(self.element_type, ScalarConverter):
+            return self._deserialize_from(buf, offset)[0]
+        n, offset = self.size_type._deserialize_from(buf, offset)
+        return SequenceView(self.element_type, buf, offset, n)
+
+    def _skip(self, buf: memoryview, offset: int) -> int:
+        n, offset = self.size_type._deserialize_from(buf, offset)
+        if (size := self.element_type.type_definition().size) is not None:
+            return offset + n * size
+        for _ in range(n):
+            offset = self.element_type._skip(buf, offset)
+        return offset
+
+    def _emit_deserialize(self, gen: _CodeGen, indent: int) -> str:
+        if self.np_dtype is not None:
+            return super()._emit_deserialize(gen, indent)
+
+        value = gen.var()
+        n = self._emit_read_size(gen, indent)
+
+        element_type = self.element_type
+        if isinstance(element_type, ScalarConverter):
+            gen.emit(indent, f"{value} = list(unpack_from('<%d{element_type.flat_fmt}' % {n}, buf, off))")
+            gen.emit(indent, f"off += {n} * {element_type.size}")
+        elif element_type.flat_fmt is not None and (size := gen.struct(element_type.flat_fmt)[1]) > 0:
+            values = gen.var("t")
+            gen.emit(indent, f"{value} = []")
+            gen.emit(indent, f"for {values} in {gen.struct(element_type.flat_fmt)[0]}.iter_unpack(buf[off:off + {n} * {size}]):")
+            item, _ = element_type._emit_unflatten(gen, indent + 1, values, 0)
+            gen.emit(indent + 1, f"{value}.append({item})")
+            gen.emit(indent, f"off += {n} * {size}")
+        else:
+            gen.emit(indent, f"{value} = []")
+            gen.emit(indent, f"for _ in range({n}):")
+            item = element_type._emit_deserialize(gen, indent + 1)
+            gen.emit(indent + 1, f"{value}.append({item})")
+        return value
+
+    def _emit_serialize(self, gen: _CodeGen, indent: int, expr: str) -> None:
+        if self.np_dtype is not None:
+            return super()._emit_serialize(gen, indent, expr)
+
+        self._emit_write_size(gen, indent, expr)
+
+        element_type = self.element_type
+        if isinstance(element_type, ScalarConverter):
+            gen.emit(indent, f"out_append(pack('<%d{element_type.flat_fmt}' % len({expr}), *{expr}))")
+        else:
+            item = gen.var()
+            gen.emit(indent, f"for {item} in {expr}:")
+            element_type._emit_serialize(gen, indent + 1, item)
+
     def default_value(self):
         return []
 
 
 class MapConverter(TypeConverter):
-    def __init__(self, types: dict[str, MessgenType], type_name: str):
-        super().__init__(types, type_name)
+    def __init__(self, types: dict[str, MessgenType], type_name: str, converters: dict[str, TypeConverter] | None = None,
+                 options: CodecOptions | None = None):
+        super().__init__(types, type_name, converters, options)
         assert self._type_class == TypeClass.map
         assert isinstance(self._type_def, MapType)
-        self.size_type = create_type_converter(types, "uint32")
-        self.key_type = create_type_converter(types, self._type_def.key_type)
-        self.value_type = create_type_converter(types, self._type_def.value_type)
+        self.size_type = typing.cast(ScalarConverter, self._create_converter(SIZE_TYPE))
+        self.key_type = self._create_converter(self._type_def.key_type)
+        self.value_type = self._create_converter(self._type_def.value_type)
+        self.iov_passthrough = self.key_type.iov_passthrough or self.value_type.iov_passthrough
 
-    def _serialize(self, data) -> bytes:
-        out = []
-        out.append(self.size_type._serialize(len(data)))
+        # Memoryviews of writable buffers are unhashable, bytes keys are always decoded as bytes
+        self._copy_keys = self._options.bytes_view and isinstance(self.key_type, BytesConverter)
+
+    def _serialized_size(self, data) -> int:
+        size = self.size_type.size
         for k, v in data.items():
-            out.append(self.key_type._serialize(k))
-            out.append(self.value_type._serialize(v))
-        return b"".join(out)
+            size += self.key_type._serialized_size(k) + self.value_type._serialized_size(v)
+        return size
 
-    def _deserialize(self, data: memoryview):
+    def _serialize_into(self, data, buf, offset: int) -> int:
+        offset = self.size_type._serialize_into(len(data), buf, offset)
+        for k, v in data.items():
+            offset = self.key_type._serialize_into(k, buf, offset)
+            offset = self.value_type._serialize_into(v, buf, offset)
+        return offset
+
+    def _serialize_to(self, data, out: bytearray) -> None:
+        out += self.size_type._serialize(len(data))
+        for k, v in data.items():
+            self.key_type._serialize_to(k, out)
+            self.value_type._serialize_to(v, out)
+
+    def _variable_size_bounds(self) -> tuple[int, int | None]:
+        return self.size_type.size, None
+
+    def _serialize_iov(self, data, writer: _IovWriter) -> None:
+        if not self.iov_passthrough:
+            return super()._serialize_iov(data, writer)
+
+        writer.write(self.size_type._serialize(len(data)))
+        for k, v in data.items():
+            self.key_type._serialize_iov(k, writer)
+            self.value_type._serialize_iov(v, writer)
+
+    def _deserialize_from(self, buf, offset: int):
         out = {}
-        offset = 0
-        n, n_size = self.size_type._deserialize(data[offset:])
-        offset += n_size
-        for i in range(n):
-            key, n = self.key_type._deserialize(data[offset:])
-            offset += n
-            value, n = self.value_type._deserialize(data[offset:])
-            offset += n
-            out[key] = value
+        n, offset = self.size_type._deserialize_from(buf, offset)
+        for _ in range(n):
+            key, offset = self.key_type._deserialize_from(buf, offset)
+            if self._copy_keys:
+                key = bytes(key)
+            out[key], offset = self.value_type._deserialize_from(buf, offset)
         return out, offset
 
+    def _skip(self, buf: memoryview, offset: int) -> int:
+        n, offset = self.size_type._deserialize_from(buf, offset)
+        for _ in range(n):
+            offset = self.value_type._skip(buf, self.key_type._skip(buf, offset))
+        return offset
+
+    def _emit_deserialize(self, gen: _CodeGen, indent: int) -> str:
+        value = gen.var()
+        n = self._emit_read_size(gen, indent)
+        gen.emit(indent, f"{value} = {{}}")
+        gen.emit(indent, f"for _ in range({n}):")
+        key = self.key_type._emit_deserialize(gen, indent + 1)
+        if self._copy_keys:
+            gen.emit(indent + 1, f"{key} = bytes({key})")
+        item = self.value_type._emit_deserialize(gen, indent + 1)
+        gen.emit(indent + 1, f"{value}[{key}] = {item}")
+        return value
+
+    def _emit_serialize(self, gen: _CodeGen, indent: int, expr: str) -> None:
+        key = gen.var()
+        item = gen.var()
+        self._emit_write_size(gen, indent, expr)
+        gen.emit(indent, f"for {key}, {item} in {expr}.items():")
+        self.key_type._emit_serialize(gen, indent + 1, key)
+        self.value_type._emit_serialize(gen, indent + 1, item)
+
     def default_value(self):
         return {}
 
 
 class StringConverter(TypeConverter):
-    def __init__(self, types: dict[str, MessgenType], type_name: str):
-        super().__init__(types, type_name)
+    def __init__(self, types: dict[str, MessgenType], type_name: str, converters: dict[str, TypeConverter] | None = None,
+                 options: CodecOptions | None = None):
+        super().__init__(types, type_name, converters, options)
         assert self._type_class == TypeClass.string
-        self.size_type = create_type_converter(types, "uint32")
+        self.size_type = typing.cast(ScalarConverter, self._create_converter(SIZE_TYPE))
         self.struct_fmt = "<%is"
 
-    def _serialize(self, data) -> bytes:
+    def _serialized_size(self, data) -> int:
+        return self.size_type.size + (len(data) if data.isascii() else len(data.encode("utf-8")))
+
+    def _serialize_into(self, data, buf, offset: int) -> int:
         encoded_data = data.encode("utf-8")
         size = len(encoded_data)
-        return self.size_type._serialize(size) + struct.pack(self.struct_fmt % size, encoded_data)
+        offset = self.size_type._serialize_into(size, buf, offset)
+        struct.pack_into(self.struct_fmt % size, buf, offset, encoded_data)
+        return offset + size
 
-    def _deserialize(self, data: memoryview):
-        n, n_size = self.size_type._deserialize(data)
-        offset = n_size
-        value = struct.unpack(self.struct_fmt % n, data[offset: offset + n])[0]
-        offset += n
-        return value.decode("utf-8"), offset
+    def _serialize_to(self, data, out: bytearray) -> None:
+        encoded_data = data.encode("utf-8")
+        out += self.size_type._serialize(len(encoded_data))
+        out += encoded_data
+
+    def _variable_size_bounds(self) -> tuple[int, int | None]:
+        return self.size_type.size, None
+
+    def _deserialize_from(self, buf, offset: int):
+        n, offset = self.size_type._deserialize_from(buf, offset)
+        value = struct.unpack_from(self.struct_fmt % n, buf, offset)[0]
+        return value.decode("utf-8"), offset + n
+
+    def _skip(self, buf: memoryview, offset: int) -> int:
+        n, offset = self.size_type._deserialize_from(buf, offset)
+        return offset + n
+
+    def _emit_deserialize(self, gen: _CodeGen, indent: int) -> str:
+        value = gen.var()
+        n = self._emit_read_size(gen, indent)
+        gen.emit(indent, f"{value} = str(buf[off:off + {n}], 'utf-8')")
+        gen.emit(indent, f"off += {n}")
+        return value
+
+    def _emit_serialize(self, gen: _CodeGen, indent: int, expr: str) -> None:
+        encoded = gen.var()
+        gen.emit(indent, f"{encoded} = {expr}.encode('utf-8')")
+        self._emit_write_size(gen, indent, encoded)
+        gen.emit(indent, f"out_append({encoded})")
 
     def default_value(self):
         return ""
 
 
 class BytesConverter(TypeConverter):
-    def __init__(self, types: dict[str, MessgenType], type_name: str):
-        super().__init__(types, type_name)
+    def __init__(self, types: dict[str, MessgenType], type_name: str, converters: dict[str, TypeConverter] | None = None,
+                 options: CodecOptions | None = None):
+        super().__init__(types, type_name, converters, options)
         assert self._type_class == TypeClass.bytes
-        self.size_type = create_type_converter(types, "uint32")
-        self.struct_fmt = "<%is"
-
-    def _serialize(self, data) -> bytes:
-        return self.size_type._serialize(len(data)) + struct.pack(self.struct_fmt % len(data), data)
+        self.size_type = typing.cast(ScalarConverter, self._create_converter(SIZE_TYPE))
+        self.iov_passthrough = True
 
-    def _deserialize(self, data: memoryview):
-        n, n_size = self.size_type._deserialize(data)
-        offset = n_size
-        value = struct.unpack(self.struct_fmt % n, data[offset: offset + n])[0]
-        offset += n
-        return value, offset
+    @staticmethod
+    def _byte_buffer(data) -> typing.Any:
+        # Sizes are counted in bytes, `len()` of other buffers like `array('H')` counts their items
+        if isinstance(data, (bytes, bytearray)):
+            return data
+        return memoryview(data).cast("B")
+
+    def _serialized_size(self, data) -> int:
+        return self.size_type.size + len(self._byte_buffer(data))
+
+    def _serialize_into(self, data, buf, offset: int) -> int:
+        data = self._byte_buffer(data)
+        size = len(data)
+        offset = self.size_type._serialize_into(size, buf, offset)
+        end = offset + size
+        if end > len(buf):
+            raise struct.error(f"pack_into requires a buffer of at least {end} bytes")
+        buf[offset:end] = data
+        return end
+
+    def _serialize_to(self, data, out: bytearray) -> None:
+        data = self._byte_buffer(data)
+        out += self.size_type._serialize(len(data))
+        out += data
+
+    def _variable_size_bounds(self) -> tuple[int, int | None]:
+        return self.size_type.size, None
+
+    def _serialize_iov(self, data, writer: _IovWriter) -> None:
+        data = self._byte_buffer(data)
+        writer.write(self.size_type._serialize(len(data)))
+        writer.write_buffer(data)
+
+    def _deserialize_from(self, buf, offset: int):
+        n, offset = self.size_type._deserialize_from(buf, offset)
+        end = offset + n
+        if end > len(buf):
+            raise MessgenError(f"Bytes field of size={n} at offset={offset} exceeds data_size={len(buf)}")
+        if self._options.bytes_view:
+            return memoryview(buf)[offset:end], end
+        return bytes(buf[offset:end]), end
+
+    def _skip(self, buf: memoryview, offset: int) -> int:
+        n, offset = self.size_type._deserialize_from(buf, offset)
+        return offset + n
+
+    def _emit_deserialize(self, gen: _CodeGen, indent: int) -> str:
+        value = gen.var()
+        n = self._emit_read_size(gen, indent)
+        # Truncated data is detected by the final size check of `deserialize`
+        if self._options.bytes_view:
+            gen.emit(indent, f"{value} = buf[off:off + {n}]")
+        else:
+            gen.emit(indent, f"{value} = bytes(buf[off:off + {n}])")
+        gen.emit(indent, f"off += {n}")
+        return value
+
+    def _emit_serialize(self, gen: _CodeGen, indent: int, expr: str) -> None:
+        value = gen.var()
+        gen.emit(indent, f"{value} = {expr}")
+        gen.emit(indent, f"if not isinstance({value}, (bytes, bytearray)):")
+        gen.emit(indent + 1, f"{value} = memoryview({value}).cast('B')")
+        self._emit_write_size(gen, indent, value)
+        gen.emit(indent, f"out_append({value})")
 
     def default_value(self):
         return b""
 
 
 class ExternalConverter(TypeConverter):
-    def __init__(self, types: dict[str, MessgenType], type_name: str):
-        super().__init__(types, type_name)
+    def __init__(self, types: dict[str, MessgenType], type_name: str, converters: dict[str, TypeConverter] | None = None,
+                 options: CodecOptions | None = None):
+        super().__init__(types, type_name, converters, options)
         assert self._type_class == TypeClass.external
 
-    def _serialize(self, data) -> bytes:
+    def _serialized_size(self, data) -> int:
+        raise RuntimeError("External types are not implemented yet")
+
+    def _serialize_into(self, data, buf, offset: int) -> int:
         raise RuntimeError("External types are not implemented yet")
 
-    def _deserialize(self, data):
+    def _deserialize_from(self, buf, offset: int):
         raise RuntimeError("External types are not implemented yet")
 
     def default_value(self):
         raise RuntimeError("External types are not implemented yet")
 
 
-def create_type_converter(types: dict[str, MessgenType], type_name: str) -> TypeConverter:
+class StructView(Mapping):
+    """Read-only mapping over a serialized struct, each field is decoded when it is accessed.
+
+    Offsets of the fixed-size fields prefix are known up front, offsets of the fields
+    after it are computed on first access by skipping over the preceding fields.
+    """
+
+    __slots__ = ("_converter", "_buf", "_offset", "_offsets")
+
+    def __init__(self, converter: StructConverter, buf: memoryview, offset: int):
+        self._converter = converter
+        self._buf = buf
+        self._offset = offset
+        self._offsets = converter.prefix_offsets
+
+    def __getitem__(self, field_name: str) -> typing.Any:
+        idx = self._converter.field_index[field_name]
+        try:
+            return self._converter.fields[idx][1]._view_from(self._buf, self._field_offset(idx))
+        except (struct.error, IndexError) as e:
+            raise MessgenError(
+                f'Failed to deserialize field={field_name} data_size={len(self._buf)} type_name={self._converter.type_name()} error="{e}"') from e
+
+    def __contains__(self, field_name: object) -> bool:
+        # Membership is known from the schema, without decoding the field
+        return field_name in self._converter.field_index
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._converter.field_names)
+
+    def __len__(self) -> int:
+        return len(self._converter.fields)
+
+    def __repr__(self) -> str:
+        return f"StructView(type_name={self._converter.type_name()}, offset={self._offset})"
+
+    def _field_offset(self, idx: int) -> int:
+        offsets = self._offsets
+        if idx >= len(offsets):
+            if offsets is self._converter.prefix_offsets:
+                offsets = self._offsets = list(offsets)
+            fields = self._converter.fields
+            while idx >= len(offsets):
+                prev = len(offsets) - 1
+                offsets.append(fields[prev][1]._skip(self._buf, self._offset + offsets[prev]) - self._offset)
+        return self._offset + offsets[idx]
+
+
+class Projection:
+    """Decoder of a subset of struct fields.
+
+    Unrequested fields are skipped by size arithmetic, fixed-size ones by their known size
+    and variable size ones by reading only their length prefixes. Decoding stops after the
+    last requested field, so the message size is not validated.
+    """
+
+    _ADVANCE = 0
+    _SKIP = 1
+    _DECODE = 2
+
+    def __init__(self, converter: StructConverter, fields: typing.Sequence[str], complete: bool = False):
+        self._converter = converter
+
+        selected: dict[str, list[str] | None] = {}
+        for path in fields:
+            field_name, _, sub_path = path.partition(".")
+            if field_name not in converter.field_index:
+                raise MessgenError(f"Unsupported field={field_name} in projection of type_name={converter.type_name()}")
+            if not sub_path:
+                selected[field_name] = None
+            elif (sub_paths := selected.setdefault(field_name, [])) is not None:
+                sub_paths.append(sub_path)
+
+        # Fields after the last selected one are only walked when the end offset is needed by the enclosing struct
+        last = max((converter.field_index[field_name] for field_name in selected), default=-1)
+        if complete:
+            last = len(converter.fields) - 1
+
+        self._ops: list[tuple[int, typing.Any, str]] = []
+        for field_name, field_type in converter.fields[:last + 1]:
+            if field_name not in selected:
+                if (size := field_type.type_definition().size) is None:
+                    self._ops.append((self._SKIP, field_type, field_name))
+                elif self._ops and self._ops[-1][0] == self._ADVANCE:
+                    self._ops[-1] = (self._ADVANCE, self._ops[-1][1] + size, field_name)
+                else:
+                    self._ops.append((self._ADVANCE, size, field_name))
+            elif (sub_paths := selected[field_name]) is None:
+                self._ops.append((self._DECODE, field_type._compiled_deserialize or field_type._deserialize_from, field_name))
+            elif isinstance(field_type, StructConverter):
+                self._ops.append((self._DECODE, Projection(field_type, sub_paths, complete=True)._deserialize_from, field_name))
+            else:
+                raise MessgenError(f"Unsupported nested projection of field={field_name} in type_name={converter.type_name()}")
+
+    def deserialize(self, data: bytes | memoryview) -> dict:
+        data = memoryview(data)
+        try:
+            return self._deserialize_from(data, 0)[0]
+        except Exception as e:
+            raise MessgenError(
+                f'Failed to deserialize data_size={len(data)} type_name={self._converter.type_name()} error="{e}"') from e
+
+    def _deserialize_from(self, buf: memoryview, offset: int) -> tuple[dict, int]:
+        out = {}
+        for op, arg, field_name in self._ops:
+            if op == self._ADVANCE:
+                offset += arg
+            elif op == self._SKIP:
+                offset = arg._skip(buf, offset)
+            else:
+                out[field_name], offset = arg(buf, offset)
+                # Compiled decoders rely on the final size check for truncated data, done here for every decoded field
+                if offset > len(buf):
+                    raise MessgenError(f"Field={field_name} ends at offset={offset} after data_size={len(buf)}")
+        return out, offset
+
+
+class SequenceView(Sequence):
+    """Read-only sequence over serialized vector or array elements, each element is decoded when it is accessed."""
+
+    __slots__ = ("_element_type", "_buf", "_offsets", "_element_size", "_len")
+
+    def __init__(self, element_type: TypeConverter, buf: memoryview, offset: int, n: int):
+        self._element_type = element_type
+        self._buf = buf
+        self._offsets = [offset]
+        self._element_size = element_type.type_definition().size
+        self._len = n
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self._len))]
+        if idx < 0:
+            idx += self._len
+        if not 0 <= idx < self._len:
+            raise IndexError("SequenceView index out of range")
+        try:
+            return self._element_type._view_from(self._buf, self._element_offset(idx))
+        except (struct.error, IndexError) as e:
+            raise MessgenError(
+                f'Failed to deserialize index={idx} data_size={len(self._buf)} type_name={self._element_type.type_name()} error="{e}"') from e
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __repr__(self) -> str:
+        return f"SequenceView(type_name={self._element_type.type_name()}, len={self._len})"
+
+    def _element_offset(self, idx: int) -> int:
+        offsets = self._offsets
+        if self._element_size is not None:
+            return offsets[0] + idx * self._element_size
+        while idx >= len(offsets):
+            offsets.append(self._element_type._skip(self._buf, offsets[-1]))
+        return offsets[idx]
+
+
+_CONVERTER_CLASSES: dict[TypeClass, type[TypeConverter]] = {
+    TypeClass.scalar: ScalarConverter,
+    TypeClass.decimal: DecimalConverter,
+    TypeClass.enum: EnumConverter,
+    TypeClass.bitset: BitsetConverter,
+    TypeClass.struct: StructConverter,
+    TypeClass.array: ArrayConverter,
+    TypeClass.vector: VectorConverter,
+    TypeClass.map: MapConverter,
+    TypeClass.string: StringConverter,
+    TypeClass.bytes: BytesConverter,
+    TypeClass.external: ExternalConverter,
+}
+
+
+def create_type_converter(types: dict[str, MessgenType], type_name: str,
+                          converters: dict[str, TypeConverter] | None = None, options: CodecOptions | None = None) -> TypeConverter:
+    """Create a converter for `type_name`.
+
+    Converters are interned in `converters` by type name, so the converter graph
+    of all types sharing the same cache is built once and shared between them.
+    All converters sharing the cache must be created with the same `options`.
+    """
+    if converters is None:
+        converters = {}
+    elif (converter := converters.get(type_name)) is not None:
+        return converter
+
     type_def = types[type_name]
     type_class = type_def.type_class
-    if type_class == TypeClass.scalar:
-        return ScalarConverter(types, type_name)
-    elif type_class == TypeClass.decimal:
-        return DecimalConverter(types, type_name)
-    elif type_class == TypeClass.enum:
-        return EnumConverter(types, type_name)
-    elif type_class == TypeClass.bitset:
-        return BitsetConverter(types, type_name)
-    elif type_class == TypeClass.struct:
-        return StructConverter(types, type_name)
-    elif type_class == TypeClass.array:
-        return ArrayConverter(types, type_name)
-    elif type_class == TypeClass.vector:
-        return VectorConverter(types, type_name)
-    elif type_class == TypeClass.map:
-        return MapConverter(types, type_name)
-    elif type_class == TypeClass.string:
-        return StringConverter(types, type_name)
-    elif type_class == TypeClass.bytes:
-        return BytesConverter(types, type_name)
-    elif type_class == TypeClass.external:
-        return ExternalConverter(types, type_name)
-    raise RuntimeError('Unsupported field type class "%s" in %s' % (type_class, type_def.type))
+    if (converter_class := _CONVERTER_CLASSES.get(type_class)) is None:
+        raise RuntimeError('Unsupported field type class "%s" in %s' % (type_class, type_def.type))
+
+    converter = converter_class(types, type_name, converters, options)
+    converters[type_name] = converter
+    return converter
 
 
 class MessageInfo:
@@ -566,6 +2050,7 @@ class MessageInfo:
         self._proto_name = proto_name
         self._message = message
         self._type_converter = type_converter
+        self._message_hash = hash_message(message) ^ type_converter.type_hash()
 
     def proto_id(self) -> int:
         return self._message.proto_id
@@ -580,7 +2065,7 @@ class MessageInfo:
         return self._message.name
 
     def message_hash(self) -> int:
-        return hash_message(self._message) ^ self._type_converter.type_hash()
+        return self._message_hash
 
     def type_name(self) -> str:
         return self._type_converter.type_name()
@@ -596,6 +2081,12 @@ class ProtocolInfo:
         self._proto_id = next(iter(messages)).proto_id()
         self._proto_name = next(iter(messages)).proto_name()
         self._messages = messages
+        self._messages_by_id = {msg.message_id(): msg for msg in messages}
+        self._messages_by_name = {msg.message_name(): msg for msg in messages}
+
+        self._proto_hash = 0
+        for msg in messages:
+            self._proto_hash ^= msg.message_hash()
 
     def proto_id(self) -> int:
         return self._proto_id
@@ -604,41 +2095,63 @@ class ProtocolInfo:
         return self._proto_name
 
     def proto_hash(self) -> int:
-        hash = 0
-        for msg in self._messages:
-            hash ^= msg.message_hash()
-        return hash
+        return self._proto_hash
 
     def messages(self) -> list[MessageInfo]:
         return self._messages
 
+    def message_info_by_id(self, message_id: int) -> MessageInfo:
+        if (message_info := self._messages_by_id.get(message_id)) is not None:
+            return message_info
+        raise MessgenError(f"Unsupported proto_id={self._proto_id} message_id={message_id}")
+
+    def message_info_by_name(self, message_name: str) -> MessageInfo:
+        if (message_info := self._messages_by_name.get(message_name)) is not None:
+            return message_info
+        raise MessgenError(f"Unsupported proto_name={self._proto_name} message_name={message_name}")
+
 
 class Codec:
-    def __init__(self) -> None:
+    def __init__(self, options: CodecOptions | None = None) -> None:
+        self._options = options if options is not None else CodecOptions()
         self._converters_by_name: dict[str, TypeConverter] = {}
-        self._id_by_name: dict[tuple[str, str], tuple[int, Message]] = {}
-        self._name_by_id: dict[tuple[int, int], tuple[str, Message]] = {}
+        self._protocols_by_name: dict[str, ProtocolInfo] = {}
+        self._protocols_by_id: dict[int, ProtocolInfo] = {}
+        self._handlers: dict[tuple[int, int], tuple[TypeConverter, typing.Callable[[typing.Any], typing.Any], bool]] = {}
+        # Running tasks of coroutine handlers, referenced until done
+        self._tasks: set[typing.Any] = set()
 
-    def load_yaml(self, type_dirs: list[str | Path], protocols: list[str] | None = None):
+    def load_yaml(self, type_dirs: list[str | Path], protocols: list[str] | None = None, compile_converters: bool = False):
         parsed_types = parse_types(type_dirs)
+        converters: dict[str, TypeConverter] = {}
         for type_name in parsed_types:
-            self._converters_by_name[type_name] = create_type_converter(parsed_types, type_name)
+            create_type_converter(parsed_types, type_name, converters, self._options)
+        self._converters_by_name.update(converters)
+
+        if compile_converters:
+            for converter in converters.values():
+                if converter.type_definition().type_class != TypeClass.external:
+                    converter.compile()
 
         if protocols:
             parsed_protocols = parse_protocols(protocols)
             for proto_name, proto_def in parsed_protocols.items():
-                for msg_id, message in proto_def.messages.items():
-                    self._id_by_name[(proto_name, message.name)] = (proto_def.proto_id, message)
-                    self._name_by_id[(proto_def.proto_id, msg_id)] = (proto_name, message)
+                messages = [
+                    MessageInfo(proto_def.proto_id, proto_name, message, self.type_converter(message.type))
+                    for message in proto_def.messages.values()
+                ]
+                if not messages:
+                    continue
+
+                protocol_info = ProtocolInfo(messages)
+                self._protocols_by_name[proto_name] = protocol_info
+                self._protocols_by_id[proto_def.proto_id] = protocol_info
 
     def types(self) -> list[str]:
         return sorted(list(self._converters_by_name.keys()))
 
     def protocols(self) -> list[str]:
-        proto_names = set()
-        for proto_name, _ in self._id_by_name.keys():
-            proto_names.add(proto_name)
-        return sorted(list(proto_names))
+        return sorted(list(self._protocols_by_name.keys()))
 
     def type_definition(self, type_name: str) -> MessgenType:
         if type_name in self._converters_by_name:
@@ -651,39 +2164,64 @@ class Codec:
         raise MessgenError(f"Unsupported type_name={type_name}")
 
     def protocol_info_by_name(self, proto_name: str) -> ProtocolInfo:
-        messages = []
-        for p_name, message_name in self._id_by_name.keys():
-            if p_name == proto_name:
-                messages.append(self.message_info_by_name(proto_name, message_name))
-
-        if not messages:
-            raise MessgenError(f"Unsupported proto_name={proto_name}")
-
-        return ProtocolInfo(messages)
+        if (protocol_info := self._protocols_by_name.get(proto_name)) is not None:
+            return protocol_info
+        raise MessgenError(f"Unsupported proto_name={proto_name}")
 
     def protocol_info_by_id(self, proto_id: int) -> ProtocolInfo:
-        messages = []
-        for p_id, msg_id in self._name_by_id.keys():
-            if p_id == proto_id:
-                messages.append(self.message_info_by_id(proto_id, msg_id))
-
-        if not messages:
-            raise MessgenError(f"Unsupported proto_id={proto_id}")
-
-        return ProtocolInfo(messages)
+        if (protocol_info := self._protocols_by_id.get(proto_id)) is not None:
+            return protocol_info
+        raise MessgenError(f"Unsupported proto_id={proto_id}")
 
     def message_info_by_id(self, proto_id: int, message_id: int) -> MessageInfo:
-        key = (proto_id, message_id)
-        if key not in self._name_by_id:
-            raise MessgenError(f"Unsupported proto_id={proto_id} message_id={message_id}")
-
-        proto_name, message = self._name_by_id[key]
-        return MessageInfo(proto_id, proto_name, message, self._converters_by_name[message.type])
+        if (protocol_info := self._protocols_by_id.get(proto_id)) is not None:
+            return protocol_info.message_info_by_id(message_id)
+        raise MessgenError(f"Unsupported proto_id={proto_id} message_id={message_id}")
 
     def message_info_by_name(self, proto_name: str, message_name: str) -> MessageInfo:
-        key = (proto_name, message_name)
-        if key not in self._id_by_name:
-            raise MessgenError(f"Unsupported proto_name={proto_name} message_name={message_name}")
-
-        proto_id, message = self._id_by_name[key]
-        return MessageInfo(proto_id, proto_name, message, self._converters_by_name[message.type])
+        if (protocol_info := self._protocols_by_name.get(proto_name)) is not None:
+            return protocol_info.message_info_by_name(message_name)
+        raise MessgenError(f"Unsupported proto_name={proto_name} message_name={message_name}")
+
+    def message_info(self, proto: str | int, message: str | int) -> MessageInfo:
+        """Message info with protocol and message given by name or id."""
+        protocol_info = self.protocol_info_by_name(proto) if isinstance(proto, str) else self.protocol_info_by_id(proto)
+        if isinstance(message, str):
+            return protocol_info.message_info_by_name(message)
+        return protocol_info.message_info_by_id(message)
+
+    def register_handler(self, proto: str | int, message: str | int, fn: typing.Callable[[typing.Any], typing.Any]) -> None:
+        """Register `fn` to be called by `dispatch` with decoded messages, protocol and message are given by name or id."""
+        message_info = self.message_info(proto, message)
+        self._handlers[(message_info.proto_id(), message_info.message_id())] = (
+            message_info.type_converter(), fn, inspect.iscoroutinefunction(fn))
+
+    def unregister_handler(self, proto: str | int, message: str | int) -> None:
+        message_info = self.message_info(proto, message)
+        self._handlers.pop((message_info.proto_id(), message_info.message_id()), None)
+
+    def dispatch(self, proto_id: int, message_id: int, payload: bytes | memoryview) -> bool:
+        """Decode `payload` and pass it to the registered handler.
+
+        Coroutine function handlers are scheduled as tasks on the running event loop, with messages decoded from
+        a copy of the payload as they run after `payload` may be reused. Returns False without decoding the payload
+        if the message is unknown or has no handler.
+        """
+        if (entry := self._handlers.get((proto_id, message_id))) is None:
+            return False
+
+        converter, fn, is_coroutine = entry
+        if not is_coroutine:
+            fn(converter.deserialize(payload))
+            return True
+
+        # asyncio is needed only by coroutine handlers
+        import asyncio
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            raise MessgenError(f"Coroutine handler for proto_id={proto_id} message_id={message_id} needs a running event loop")
+        task = loop.create_task(fn(converter.deserialize(bytes(payload))))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
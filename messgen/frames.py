@@ -0,0 +1,294 @@
+import array
+import mmap
+import os
+import struct
+import typing
+
+from collections.abc import (
+    Iterator,
+)
+from pathlib import (
+    Path,
+)
+
+from .common import SIZE_TYPE
+from .dynamic import (
+    Codec,
+    MessgenError,
+    STRUCT_TYPES_MAP,
+    TypeConverter,
+)
+
+
+class FrameHeader:
+    """Layout of the header preceding each payload in a stream of frames.
+
+    The header is packed with the little-endian struct format `fmt`, `fields` names its items in order and must
+    contain "proto_id", "message_id" and "size" of the payload. Items with other names are ignored on reading and
+    packed as zeros.
+    """
+
+    def __init__(self, fmt: str = "<HH" + STRUCT_TYPES_MAP[SIZE_TYPE], fields: typing.Sequence[str] = ("proto_id", "message_id", "size")):
+        if fmt[:1] not in "<>!=@":
+            fmt = "<" + fmt
+        self.struct = struct.Struct(fmt)
+        self.fields = tuple(fields)
+        if len(self.struct.unpack(bytes(self.struct.size))) != len(self.fields):
+            raise MessgenError(f"Frame header fmt={fmt} does not match fields={self.fields}")
+        try:
+            self._indexes = tuple(self.fields.index(field_name) for field_name in ("proto_id", "message_id", "size"))
+        except ValueError as e:
+            raise MessgenError(f"Frame header fields={self.fields} must include proto_id, message_id and size") from e
+        self.size = self.struct.size
+
+    def unpack_from(self, buf, offset: int = 0) -> tuple[int, int, int]:
+        """Return (proto_id, message_id, size) of the header at `offset`."""
+        values = self.struct.unpack_from(buf, offset)
+        proto_idx, message_idx, size_idx = self._indexes
+        return values[proto_idx], values[message_idx], values[size_idx]
+
+    def pack(self, proto_id: int, message_id: int, size: int) -> bytes:
+        values = [0] * len(self.fields)
+        proto_idx, message_idx, size_idx = self._indexes
+        values[proto_idx], values[message_idx], values[size_idx] = proto_id, message_id, size
+        return self.struct.pack(*values)
+
+
+class FrameReader:
+    """Iterate (proto_id, message_id, payload) frames of a binary file-like object or bytes.
+
+    Files are read with `readinto` straight into a reusable buffer of `block_size`, grown for larger frames, each
+    read fills the free space of the buffer, at least a quarter of it.
+    Payloads are memoryview slices of that buffer and stay valid only until the next frame is read, they must be
+    copied with `bytes()` to be kept. Payloads of bytes sources are slices of the source itself.
+    """
+
+    def __init__(self, source: typing.Any, codec: Codec | None = None, header: FrameHeader | None = None, block_size: int = 1 << 20):
+        self._source = source
+        self._codec = codec
+        self._header = header if header is not None else FrameHeader()
+        self._block_size = max(block_size, self._header.size)
+
+    def __iter__(self) -> Iterator[tuple[int, int, memoryview]]:
+        if isinstance(self._source, (bytes, bytearray, memoryview)):
+            return self._frames_from_buffer(memoryview(self._source).cast("B"))
+        return self._frames_from_file()
+
+    def messages(self) -> Iterator[tuple[int, int, typing.Any]]:
+        """Iterate (proto_id, message_id, message) with payloads decoded by the message types of the codec."""
+        if self._codec is None:
+            raise MessgenError("FrameReader needs a codec to decode messages")
+        codec = self._codec
+        converters: dict[tuple[int, int], TypeConverter] = {}
+        for proto_id, message_id, payload in self:
+            if (converter := converters.get((proto_id, message_id))) is None:
+                converter = codec.message_info_by_id(proto_id, message_id).type_converter()
+                converters[(proto_id, message_id)] = converter
+            yield proto_id, message_id, converter.deserialize(payload)
+
+    def _frames_from_buffer(self, view: memoryview) -> Iterator[tuple[int, int, memoryview]]:
+        header = self._header
+        offset = 0
+        while offset + header.size <= len(view):
+            proto_id, message_id, size = header.unpack_from(view, offset)
+            start = offset + header.size
+            if start + size > len(view):
+                break
+            yield proto_id, message_id, view[start:start + size]
+            offset = start + size
+        if offset != len(view):
+            raise MessgenError(f"Truncated frame at offset={offset} data_size={len(view)}")
+
+    def _frames_from_file(self) -> Iterator[tuple[int, int, memoryview]]:
+        decoder = FrameDecoder(self._header, self._block_size)
+        while (frames := decoder.readinto(self._source)) is not None:
+            yield from frames
+
+
+class FrameDecoder:
+    """Incremental decoder of frames received in chunks of arbitrary size.
+
+    Received bytes are appended to an internal buffer of `buffer_size`, grown for larger frames. The incomplete
+    frame at the end is moved to the front only when the free space runs out, and its header is parsed only once.
+    Returned payloads are memoryview slices of the buffer and stay valid only until the next call.
+    """
+
+    def __init__(self, header: FrameHeader | None = None, buffer_size: int = 1 << 16):
+        self._header = header if header is not None else FrameHeader()
+        self._buf = bytearray(max(buffer_size, self._header.size))
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+        # Parsed header of the incomplete frame at `_start`
+        self._frame: tuple[int, int, int] | None = None
+
+    def pending(self) -> int:
+        """Number of buffered bytes of the incomplete frame."""
+        return self._end - self._start
+
+    def feed(self, data) -> list[tuple[int, int, memoryview]]:
+        """Append `data` and return the (proto_id, message_id, payload) frames it completes."""
+        n = len(data)
+        self._reserve(n)
+        self._buf[self._end:self._end + n] = data
+        return self._advance(n)
+
+    def recv_into(self, sock, flags: int = 0) -> list[tuple[int, int, memoryview]] | None:
+        """Receive from `sock` directly into the buffer and return completed frames, None if the peer closed the connection."""
+        return self._fill(lambda view: sock.recv_into(view, 0, flags))
+
+    def readinto(self, file) -> list[tuple[int, int, memoryview]] | None:
+        """Read from binary `file` directly into the buffer and return completed frames, None at the end of file."""
+        return self._fill(file.readinto)
+
+    def _fill(self, read_into: typing.Callable[[memoryview], int | None]) -> list[tuple[int, int, memoryview]] | None:
+        # Read at least the rest of the incomplete frame, and in blocks of a quarter of the buffer otherwise
+        needed = self._header.size if self._frame is None else self._header.size + self._frame[2]
+        self._reserve(max(needed - self.pending(), len(self._buf) // 4))
+        n = read_into(self._view[self._end:])
+        if not n:
+            if self.pending():
+                raise MessgenError(f"Truncated frame of {self.pending()} bytes at the end of the stream")
+            return None
+        return self._advance(n)
+
+    def _reserve(self, n: int) -> None:
+        if self._end + n <= len(self._buf):
+            return
+
+        pending = self._end - self._start
+        if pending + n <= len(self._buf):
+            self._buf[:pending] = self._buf[self._start:self._end]
+        else:
+            # Payloads handed out before keep the old buffer alive
+            buf = bytearray(max(pending + n, 2 * len(self._buf)))
+            buf[:pending] = self._view[self._start:self._end]
+            self._buf = buf
+            self._view = memoryview(buf)
+        self._start, self._end = 0, pending
+
+    def _advance(self, n: int) -> list[tuple[int, int, memoryview]]:
+        self._end = buf_end = self._end + n
+        header_size = self._header.size
+        unpack_header = self._header.unpack_from
+        buf, view, start, frame = self._buf, self._view, self._start, self._frame
+        frames = []
+        while True:
+            if frame is None:
+                if buf_end - start < header_size:
+                    break
+                frame = unpack_header(buf, start)
+            end = start + header_size + frame[2]
+            if end > buf_end:
+                break
+            frames.append((frame[0], frame[1], view[start + header_size:end]))
+            start = end
+            frame = None
+        self._start, self._frame = start, frame
+        return frames
+
+
+def _map_file(path: str | Path) -> tuple[mmap.mmap | None, memoryview]:
+    """Map the file at `path` read-only, return the mapping, None for empty files that can't be mapped, and its view."""
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else None
+    return mapping, memoryview(mapping if mapping is not None else b"")
+
+
+def _unmap_file(mapping: mmap.mmap | None, view: memoryview) -> None:
+    """Release `view` and close `mapping`, a mapping still referenced by payload views is unmapped with the last one."""
+    view.release()
+    if mapping is not None:
+        try:
+            mapping.close()
+        except BufferError:
+            pass
+
+
+class MappedFrameReader:
+    """Random access to the (proto_id, message_id, payload) frames of a recording file mapped with `mmap`.
+
+    Offsets of the frames are indexed on the first scan of the file, done lazily by iteration and indexing as far
+    as needed. Payloads are memoryview slices of the mapping passed to the converters without copying, they stay
+    valid after `close()` until they are released.
+    """
+
+    # Number of frames indexed ahead by iteration and indexing
+    _SCAN_BATCH = 4096
+
+    def __init__(self, path: str | Path, codec: Codec | None = None, header: FrameHeader | None = None):
+        self._codec = codec
+        self._header = header if header is not None else FrameHeader()
+        self._mmap, self._view = _map_file(path)
+        self._offsets = array.array("Q")
+        # Offset of the first frame not indexed yet
+        self._scan_offset = 0
+        self._converters: dict[tuple[int, int], TypeConverter] = {}
+
+    def __enter__(self) -> "MappedFrameReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        mapping, self._mmap = self._mmap, None
+        _unmap_file(mapping, self._view)
+
+    def __len__(self) -> int:
+        self._scan(None)
+        return len(self._offsets)
+
+    def __getitem__(self, idx: int) -> tuple[int, int, memoryview]:
+        if idx < 0:
+            idx += len(self)
+        elif idx >= len(self._offsets):
+            self._scan(idx + self._SCAN_BATCH)
+        if not 0 <= idx < len(self._offsets):
+            raise IndexError(f"Frame index={idx} out of range")
+        return self._frame_at(self._offsets[idx])
+
+    def __iter__(self) -> Iterator[tuple[int, int, memoryview]]:
+        idx = 0
+        while idx < len(self._offsets) or self._scan(idx + self._SCAN_BATCH):
+            yield self._frame_at(self._offsets[idx])
+            idx += 1
+
+    def message(self, idx: int) -> tuple[int, int, typing.Any]:
+        """Return (proto_id, message_id, message) of the frame `idx` decoded by its message type."""
+        proto_id, message_id, payload = self[idx]
+        return proto_id, message_id, self._converter(proto_id, message_id).deserialize(payload)
+
+    def messages(self) -> Iterator[tuple[int, int, typing.Any]]:
+        """Iterate (proto_id, message_id, message) with payloads decoded by the message types of the codec."""
+        for proto_id, message_id, payload in self:
+            yield proto_id, message_id, self._converter(proto_id, message_id).deserialize(payload)
+
+    def _converter(self, proto_id: int, message_id: int) -> TypeConverter:
+        if (converter := self._converters.get((proto_id, message_id))) is None:
+            if self._codec is None:
+                raise MessgenError("MappedFrameReader needs a codec to decode messages")
+            converter = self._codec.message_info_by_id(proto_id, message_id).type_converter()
+            self._converters[(proto_id, message_id)] = converter
+        return converter
+
+    def _frame_at(self, offset: int) -> tuple[int, int, memoryview]:
+        proto_id, message_id, size = self._header.unpack_from(self._view, offset)
+        start = offset + self._header.size
+        return proto_id, message_id, self._view[start:start + size]
+
+    def _scan(self, count: int | None) -> bool:
+        """Index frames until `count` of them are indexed or up to the end of file if None, return True if any was added."""
+        offsets, view, header = self._offsets, self._view, self._header
+        indexed = len(offsets)
+        offset = self._scan_offset
+        while offset < len(view) and (count is None or len(offsets) < count):
+            if offset + header.size > len(view):
+                raise MessgenError(f"Truncated frame at offset={offset} data_size={len(view)}")
+            end = offset + header.size + header.unpack_from(view, offset)[2]
+            if end > len(view):
+                raise MessgenError(f"Truncated frame at offset={offset} data_size={len(view)}")
+            offsets.append(offset)
+            offset = end
+        self._scan_offset = offset
+        return len(offsets) > indexed
@@ -0,0 +1,126 @@
+import asyncio
+import typing
+
+from collections.abc import (
+    AsyncIterator,
+)
+
+from .dynamic import (
+    Codec,
+    MessgenError,
+    TypeConverter,
+)
+from .frames import (
+    FrameDecoder,
+    FrameHeader,
+)
+
+
+class FrameProtocol(asyncio.Protocol):
+    """asyncio protocol decoding received frames and dispatching them to the handlers registered in `codec`.
+
+    Handlers may be callbacks or coroutine functions, coroutines are scheduled as tasks on the running loop by
+    `Codec.dispatch`. Messages are decoded on the loop right in `data_received`. For callbacks they are decoded in
+    place, with the `bytes_view` or `numpy` options their bytes fields and arrays reference the receive buffer and
+    are valid only during the call. For coroutine functions the payload is copied first, so the messages stay
+    valid in the task.
+    """
+
+    def __init__(self, codec: Codec, header: FrameHeader | None = None, buffer_size: int = 1 << 16):
+        self.codec = codec
+        self.transport: asyncio.BaseTransport | None = None
+        self._decoder = FrameDecoder(header, buffer_size)
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+
+    def data_received(self, data: bytes) -> None:
+        for proto_id, message_id, payload in self._decoder.feed(data):
+            self.frame_received(proto_id, message_id, payload)
+
+    def frame_received(self, proto_id: int, message_id: int, payload: memoryview) -> None:
+        """Called for every received frame, messages without a handler are skipped without decoding."""
+        self.codec.dispatch(proto_id, message_id, payload)
+
+
+class AsyncFrameReader:
+    """Asynchronously iterate (proto_id, message_id, payload) frames of an `asyncio.StreamReader`.
+
+    The stream is read in chunks of up to `buffer_size`, all frames completed by a chunk are produced without
+    waiting. Payloads are memoryview slices valid only until the next frame is read.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, codec: Codec | None = None, header: FrameHeader | None = None,
+                 buffer_size: int = 1 << 16):
+        self._reader = reader
+        self._codec = codec
+        self._header = header
+        self._buffer_size = buffer_size
+
+    async def __aiter__(self) -> AsyncIterator[tuple[int, int, memoryview]]:
+        decoder = FrameDecoder(self._header, self._buffer_size)
+        while chunk := await self._reader.read(self._buffer_size):
+            for frame in decoder.feed(chunk):
+                yield frame
+        if decoder.pending():
+            raise MessgenError(f"Truncated frame of {decoder.pending()} bytes at the end of the stream")
+
+    async def messages(self) -> AsyncIterator[tuple[int, int, typing.Any]]:
+        """Iterate (proto_id, message_id, message) with payloads decoded by the message types of the codec."""
+        if self._codec is None:
+            raise MessgenError("AsyncFrameReader needs a codec to decode messages")
+        codec = self._codec
+        converters: dict[tuple[int, int], TypeConverter] = {}
+        async for proto_id, message_id, payload in self:
+            if (converter := converters.get((proto_id, message_id))) is None:
+                converter = codec.message_info_by_id(proto_id, message_id).type_converter()
+                converters[(proto_id, message_id)] = converter
+            yield proto_id, message_id, converter.deserialize(payload)
+
+
+class FrameWriter:
+    """Write frames to an asyncio transport or `asyncio.StreamWriter`.
+
+    Frames written during one iteration of the event loop are sent together with a single `writelines` call
+    scheduled on the running loop, `flush()` sends them right away.
+    """
+
+    def __init__(self, transport: typing.Any, codec: Codec | None = None, header: FrameHeader | None = None):
+        self._transport = transport
+        self._codec = codec
+        self._header = header if header is not None else FrameHeader()
+        self._pending: list[bytes | memoryview] = []
+        self._flush_handle: asyncio.Handle | None = None
+        self._messages: dict[tuple[str | int, str | int], tuple[int, int, TypeConverter]] = {}
+
+    def write(self, proto_id: int, message_id: int, payload: bytes | memoryview) -> None:
+        """Queue a frame with an already serialized payload, the payload must not be modified until it is sent."""
+        self._pending.append(self._header.pack(proto_id, message_id, len(payload)))
+        self._pending.append(payload)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(self.flush)
+
+    def write_message(self, proto: str | int, message: str | int, data: typing.Any) -> None:
+        """Serialize and queue a message, protocol and message are given by name or id."""
+        if (entry := self._messages.get((proto, message))) is None:
+            if self._codec is None:
+                raise MessgenError("FrameWriter needs a codec to serialize messages")
+            message_info = self._codec.message_info(proto, message)
+            entry = (message_info.proto_id(), message_info.message_id(), message_info.type_converter())
+            self._messages[(proto, message)] = entry
+        proto_id, message_id, converter = entry
+        self.write(proto_id, message_id, converter.serialize(data))
+
+    def flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self._transport.writelines(pending)
+
+    async def drain(self) -> None:
+        """Send queued frames and wait for the flow control of a `StreamWriter`."""
+        self.flush()
+        if (drain := getattr(self._transport, "drain", None)) is not None:
+            await drain()
@@ -758,8 +758,9 @@ def render_protocol(pkg: str, proto_name: str, proto_def: Protocol, resolved_typ
 
     proto_hash = 0
     message_hashes = dict()
+    type_hashes: dict[str, int | None] = {}
     for id, msg in proto_def.messages.items():
-        type_hash =  hash_type(messgen_types[msg.type], messgen_types)
+        type_hash =  hash_type(messgen_types[msg.type], messgen_types, type_hashes)
         msg_hash = hash_message(msg) ^ type_hash if type_hash else 0
         proto_hash ^= msg_hash
         message_hashes[id] = msg_hash
@@ -865,6 +866,7 @@ class GolangGenerator:
     def __init__(self, options: dict):
         self._options: dict = options
         self._types: dict[str, MessgenType] = {}
+        self._type_hashes: dict[str, int | None] = {}
         self._resolved: dict[str, ResolvedType] = {}
 
     def generate_type(self, out_dir: Path, typename: str, ident=0) -> ResolvedType:
@@ -906,7 +908,7 @@ class GolangGenerator:
             base = self.generate_type(out_dir, bitset_type.base_type, ident+2)
             resolved = ResolvedBitset(bitset_type, base, package)
         elif type_def.type_class == TypeClass.struct:
-            struct_hash: int | None = hash_type(type_def, self._types)
+            struct_hash: int | None = hash_type(type_def, self._types, self._type_hashes)
 
             struct_type = cast(StructType, type_def)
             resolved_struct = ResolvedStruct(struct_type, struct_hash, package)
@@ -926,6 +928,7 @@ class GolangGenerator:
 
     def generate_types(self, out_dir: Path, types: dict[str, MessgenType]) -> None:
         self._types = types
+        self._type_hashes = {}
 
         # Outdir is package root
         # gomod_name is package prefix
@@ -8,8 +8,8 @@ from .model import (
     MessgenType,
     Protocol,
     TypeClass,
-    hash_type,
     hash_message,
+    hash_types,
 )
 
 
@@ -21,12 +21,13 @@ class JsonGenerator:
 
     def generate_types(self, out_dir: Path, types: dict[str, MessgenType]) -> None:
         combined: list = []
+        type_hashes = hash_types(types)
 
         for type_name in sorted(types.keys()):
             type_def = types[type_name]
             if type_def.type_class in [TypeClass.struct, TypeClass.enum, TypeClass.bitset, TypeClass.external]:
                 type_dict = asdict(type_def)
-                type_hash = hash_type(type_def, types)
+                type_hash = type_hashes[type_name]
                 type_dict["hash"] = str(type_hash) if type_hash is not None else None
                 combined.append(type_dict)
 
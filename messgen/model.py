@@ -231,14 +231,21 @@ class Protocol:
         return {message.type for message in self.messages.values()}
 
 
-def hash_type(dt: MessgenType, types: dict[str, MessgenType]) -> int | None:
+def hash_type(dt: MessgenType, types: dict[str, MessgenType], cache: dict[str, int | None] | None = None) -> int | None:
+    # `cache` memoizes dependency hashes by type name, pass the same dict to hash many types of one schema
+    if cache is None:
+        cache = {}
+
     combined_hash = _hash_dataclass(dt)
 
     for dependency in sorted(list(dt.dependencies())):
-        if dependency not in types:
+        if dependency in cache:
+            dependency_hash = cache[dependency]
+        elif dependency in types:
+            dependency_hash = cache[dependency] = hash_type(types[dependency], types, cache)
+        else:
             return None
 
-        dependency_hash = hash_type(types[dependency], types)
         if dependency_hash is None:
             return None
 
@@ -247,6 +254,14 @@ def hash_type(dt: MessgenType, types: dict[str, MessgenType]) -> int | None:
     return combined_hash
 
 
+def hash_types(types: dict[str, MessgenType]) -> dict[str, int | None]:
+    cache: dict[str, int | None] = {}
+    for type_name, type_def in types.items():
+        if type_name not in cache:
+            cache[type_name] = hash_type(type_def, types, cache)
+    return cache
+
+
 def hash_message(dt: Message) -> int:
     return _hash_dataclass(dt)
 
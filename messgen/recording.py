@@ -0,0 +1,264 @@
+import bisect
+import struct
+import typing
+
+from collections.abc import (
+    Iterator,
+)
+from pathlib import (
+    Path,
+)
+
+from .common import SIZE_TYPE
+from .dynamic import (
+    Codec,
+    MessgenError,
+    STRUCT_TYPES_MAP,
+    TypeConverter,
+)
+from .frames import (
+    _map_file,
+    _unmap_file,
+)
+
+
+# Recording container layout, all little-endian:
+#   header:  magic, number of protocols, then (proto_id, proto_hash) of each protocol of the codec
+#   blocks:  frames of (timestamp, proto_id, message_id, size) followed by the payload, in order of timestamps
+#   footer:  number of blocks, then (offset, size, frames, first timestamp, last timestamp) of each block,
+#            number of message types, then (proto_id, message_id, number of blocks) followed by the block indexes
+#   trailer: offset of the footer, magic
+_RECORDING_MAGIC = b"MGNREC01"
+_RECORDING_HEADER = struct.Struct("<8sI")
+_RECORDING_PROTOCOL = struct.Struct("<HQ")
+_RECORDING_FRAME = struct.Struct("<qHH" + STRUCT_TYPES_MAP[SIZE_TYPE])
+_RECORDING_COUNT = struct.Struct("<I")
+_RECORDING_BLOCK = struct.Struct("<QQIqq")
+_RECORDING_MESSAGE_TYPE = struct.Struct("<HHI")
+_RECORDING_TRAILER = struct.Struct("<Q8s")
+
+
+class RecordingWriter:
+    """Write a recording of timestamped messages indexed by time and message type, read by `RecordingReader`.
+
+    The recording starts with the hashes of all protocols of `codec`. Frames are grouped in blocks of about
+    `block_size` bytes, and `close()` writes the footer indexing the time range and the message types of each
+    block. Timestamps must not decrease.
+    """
+
+    def __init__(self, file: str | Path | typing.BinaryIO, codec: Codec, block_size: int = 1 << 20):
+        self._owns_file = isinstance(file, (str, Path))
+        self._file: typing.BinaryIO = open(file, "wb") if isinstance(file, (str, Path)) else file
+        self._codec = codec
+        self._block_size = block_size
+        self._offset = 0
+        self._closed = False
+        self._messages: dict[tuple[str | int, str | int], tuple[int, int, TypeConverter]] = {}
+
+        self._block = bytearray()
+        self._block_frames = 0
+        self._block_first_timestamp = 0
+        self._block_message_types: set[tuple[int, int]] = set()
+        self._last_timestamp: int | None = None
+        self._blocks: list[tuple[int, int, int, int, int]] = []
+        self._message_type_blocks: dict[tuple[int, int], list[int]] = {}
+
+        protocols = [codec.protocol_info_by_name(proto_name) for proto_name in codec.protocols()]
+        header = bytearray(_RECORDING_HEADER.pack(_RECORDING_MAGIC, len(protocols)))
+        for protocol_info in protocols:
+            header += _RECORDING_PROTOCOL.pack(protocol_info.proto_id(), protocol_info.proto_hash())
+        self._write(header)
+
+    def __enter__(self) -> "RecordingWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write(self, timestamp: int, proto_id: int, message_id: int, payload: bytes | memoryview) -> None:
+        """Append a frame with an already serialized payload."""
+        if self._closed:
+            raise MessgenError("Recording is closed")
+        if self._last_timestamp is not None and timestamp < self._last_timestamp:
+            raise MessgenError(f"Timestamp={timestamp} is earlier than the previous timestamp={self._last_timestamp}")
+
+        if not self._block_frames:
+            self._block_first_timestamp = timestamp
+        self._block += _RECORDING_FRAME.pack(timestamp, proto_id, message_id, len(payload))
+        self._block += payload
+        self._block_frames += 1
+        self._block_message_types.add((proto_id, message_id))
+        self._last_timestamp = timestamp
+        if len(self._block) >= self._block_size:
+            self._flush_block()
+
+    def write_message(self, timestamp: int, proto: str | int, message: str | int, data: typing.Any) -> None:
+        """Serialize and append a message, protocol and message are given by name or id."""
+        if (entry := self._messages.get((proto, message))) is None:
+            message_info = self._codec.message_info(proto, message)
+            entry = (message_info.proto_id(), message_info.message_id(), message_info.type_converter())
+            self._messages[(proto, message)] = entry
+        proto_id, message_id, converter = entry
+        self.write(timestamp, proto_id, message_id, converter.serialize(data))
+
+    def close(self) -> None:
+        """Write the last block and the footer, the file is closed if it was opened by the writer."""
+        if self._closed:
+            return
+        self._flush_block()
+        self._closed = True
+
+        footer = bytearray(_RECORDING_COUNT.pack(len(self._blocks)))
+        for block in self._blocks:
+            footer += _RECORDING_BLOCK.pack(*block)
+        footer += _RECORDING_COUNT.pack(len(self._message_type_blocks))
+        for (proto_id, message_id), blocks in sorted(self._message_type_blocks.items()):
+            footer += _RECORDING_MESSAGE_TYPE.pack(proto_id, message_id, len(blocks))
+            footer += struct.pack(f"<{len(blocks)}I", *blocks)
+        footer += _RECORDING_TRAILER.pack(self._offset, _RECORDING_MAGIC)
+        self._write(footer)
+
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def _write(self, data: bytes | bytearray) -> None:
+        self._file.write(data)
+        self._offset += len(data)
+
+    def _flush_block(self) -> None:
+        if not self._block_frames:
+            return
+
+        block_idx = len(self._blocks)
+        self._blocks.append((self._offset, len(self._block), self._block_frames, self._block_first_timestamp, typing.cast(int, self._last_timestamp)))
+        for message_type in self._block_message_types:
+            self._message_type_blocks.setdefault(message_type, []).append(block_idx)
+        self._write(self._block)
+
+        self._block = bytearray()
+        self._block_frames = 0
+        self._block_message_types = set()
+
+
+class RecordingReader:
+    """Read a recording written by `RecordingWriter`, mapped with `mmap`.
+
+    Blocks overlapping a time window or containing given message types are found in the footer index with binary
+    searches, only the frames of those blocks are scanned. With a `codec` the protocol hashes of the recording are
+    checked against it. Payloads are memoryview slices of the mapping, they stay valid after `close()` until released.
+    """
+
+    def __init__(self, path: str | Path, codec: Codec | None = None):
+        self._codec = codec
+        self._mmap, self._view = _map_file(path)
+        self._converters: dict[tuple[int, int], TypeConverter] = {}
+        try:
+            self._read_index()
+        except struct.error as e:
+            self.close()
+            raise MessgenError(f"Invalid recording file={path} error=\"{e}\"") from e
+        except MessgenError:
+            self.close()
+            raise
+
+    def __enter__(self) -> "RecordingReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        mapping, self._mmap = self._mmap, None
+        _unmap_file(mapping, self._view)
+
+    def _read_index(self) -> None:
+        view = self._view
+        magic, protocol_count = _RECORDING_HEADER.unpack_from(view, 0)
+        footer_offset, trailer_magic = _RECORDING_TRAILER.unpack_from(view, len(view) - _RECORDING_TRAILER.size)
+        if magic != _RECORDING_MAGIC or trailer_magic != _RECORDING_MAGIC:
+            raise MessgenError("Invalid recording magic, the recording may not be closed")
+
+        self._protocol_hashes: dict[int, int] = {}
+        for i in range(protocol_count):
+            proto_id, proto_hash = _RECORDING_PROTOCOL.unpack_from(view, _RECORDING_HEADER.size + i * _RECORDING_PROTOCOL.size)
+            self._protocol_hashes[proto_id] = proto_hash
+        if self._codec is not None:
+            for proto_id, proto_hash in self._protocol_hashes.items():
+                if self._codec.protocol_info_by_id(proto_id).proto_hash() != proto_hash:
+                    raise MessgenError(f"Recording schema of proto_id={proto_id} does not match the codec")
+
+        (block_count,), offset = _RECORDING_COUNT.unpack_from(view, footer_offset), footer_offset + _RECORDING_COUNT.size
+        self._blocks = [_RECORDING_BLOCK.unpack_from(view, offset + i * _RECORDING_BLOCK.size) for i in range(block_count)]
+        offset += block_count * _RECORDING_BLOCK.size
+        self._first_timestamps = [block[3] for block in self._blocks]
+        self._last_timestamps = [block[4] for block in self._blocks]
+
+        (message_type_count,), offset = _RECORDING_COUNT.unpack_from(view, offset), offset + _RECORDING_COUNT.size
+        self._message_type_blocks: dict[tuple[int, int], list[int]] = {}
+        for _ in range(message_type_count):
+            proto_id, message_id, count = _RECORDING_MESSAGE_TYPE.unpack_from(view, offset)
+            offset += _RECORDING_MESSAGE_TYPE.size
+            self._message_type_blocks[(proto_id, message_id)] = list(struct.unpack_from(f"<{count}I", view, offset))
+            offset += 4 * count
+
+    def protocol_hashes(self) -> dict[int, int]:
+        """Hashes of the protocols the recording was written with, by proto_id."""
+        return dict(self._protocol_hashes)
+
+    def message_types(self) -> list[tuple[int, int]]:
+        """(proto_id, message_id) of all messages in the recording."""
+        return list(self._message_type_blocks)
+
+    def time_range(self) -> tuple[int, int] | None:
+        """Timestamps of the first and last messages, None for an empty recording."""
+        if not self._blocks:
+            return None
+        return self._first_timestamps[0], self._last_timestamps[-1]
+
+    def __len__(self) -> int:
+        return sum(block[2] for block in self._blocks)
+
+    def frames(self, start: int | None = None, stop: int | None = None,
+               message_types: typing.Iterable[tuple[int, int]] | None = None) -> Iterator[tuple[int, int, int, memoryview]]:
+        """Iterate (timestamp, proto_id, message_id, payload) with timestamps in [start, stop) of the given message types."""
+        lo = 0 if start is None else bisect.bisect_left(self._last_timestamps, start)
+        hi = len(self._blocks) if stop is None else bisect.bisect_left(self._first_timestamps, stop)
+
+        selected: set[tuple[int, int]] | None = None
+        blocks: typing.Iterable[int] = range(lo, hi)
+        if message_types is not None:
+            selected = set(message_types)
+            block_set: set[int] = set()
+            for message_type in selected:
+                type_blocks = self._message_type_blocks.get(message_type, [])
+                block_set.update(type_blocks[bisect.bisect_left(type_blocks, lo):bisect.bisect_left(type_blocks, hi)])
+            blocks = sorted(block_set)
+
+        view = self._view
+        unpack_frame = _RECORDING_FRAME.unpack_from
+        for block_idx in blocks:
+            offset, size = self._blocks[block_idx][:2]
+            end = offset + size
+            while offset < end:
+                timestamp, proto_id, message_id, payload_size = unpack_frame(view, offset)
+                payload_offset = offset + _RECORDING_FRAME.size
+                offset = payload_offset + payload_size
+                if stop is not None and timestamp >= stop:
+                    return
+                if (start is not None and timestamp < start) or (selected is not None and (proto_id, message_id) not in selected):
+                    continue
+                yield timestamp, proto_id, message_id, view[payload_offset:offset]
+
+    def messages(self, start: int | None = None, stop: int | None = None,
+                 message_types: typing.Iterable[tuple[int, int]] | None = None) -> Iterator[tuple[int, int, int, typing.Any]]:
+        """Iterate (timestamp, proto_id, message_id, message) selected like `frames()`, decoded by the codec."""
+        if self._codec is None:
+            raise MessgenError("RecordingReader needs a codec to decode messages")
+        codec = self._codec
+        for timestamp, proto_id, message_id, payload in self.frames(start, stop, message_types):
+            if (converter := self._converters.get((proto_id, message_id))) is None:
+                converter = codec.message_info_by_id(proto_id, message_id).type_converter()
+                self._converters[(proto_id, message_id)] = converter
+            yield timestamp, proto_id, message_id, converter.deserialize(payload)
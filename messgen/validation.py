@@ -2,7 +2,7 @@ from typing import Any
 
 from .common import SEPARATOR
 from .model import (
-    hash_type,
+    hash_types,
     MessgenType,
     Protocol,
 )
@@ -164,8 +164,9 @@ def validate_protocol(protocol: Protocol):
 
 def validate_types(types: dict[str, MessgenType]):
     seen_hashes: dict[int, Any] = {}
+    type_hashes = hash_types(types)
     for type_name, type_def in types.items():
-        type_hash = hash_type(type_def, types)
+        type_hash = type_hashes[type_name]
         if not type_hash:
             continue
         if hash_conflict := seen_hashes.get(type_hash):
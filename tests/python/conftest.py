@@ -0,0 +1,35 @@
+import pytest
+
+from pathlib import Path
+
+from messgen.dynamic import Codec
+
+path_root = Path(__file__).parents[2]
+
+
+@pytest.fixture
+def codec():
+    codec_ = Codec()
+    codec_.load_yaml(
+        type_dirs=[path_root / "tests/msg/types", path_root / "tests/msg/types_decimal"],
+        protocols=[f"{path_root}/tests/msg/protocols:mynamespace/proto/test_proto"],
+    )
+    yield codec_
+
+
+@pytest.fixture
+def simple_struct(codec):
+    converter = codec.type_converter("mynamespace/types/simple_struct")
+    return converter.deserialize((path_root / "tests/data/serialized/bin/simple_struct.bin").read_bytes())
+
+
+@pytest.fixture
+def recorded_frames(codec):
+    # (proto_id, message_id, payload) of every message of the test protocol, the empty struct twice,
+    # payloads are the serialized reference data
+    frames = []
+    for message_name in ["simple_struct", "empty_struct", "complex_struct", "var_size_struct", "empty_struct", "flat_struct"]:
+        message_info = codec.message_info_by_name("mynamespace/proto/test_proto", message_name)
+        payload = (path_root / f"tests/data/serialized/bin/{message_name}.bin").read_bytes()
+        frames.append((message_info.proto_id(), message_info.message_id(), payload))
+    return frames
@@ -1,14 +1,21 @@
+import array
+import asyncio
+import enum
 import json
 import pytest
+import struct
 
 from pathlib import Path
 
 from decimal import (
     Decimal,
+    localcontext,
 )
 
 from messgen.model import (
     BasicType,
+    BitsetBit,
+    BitsetType,
     DecimalType,
     EnumType,
     EnumValue,
@@ -16,11 +23,17 @@ from messgen.model import (
     get_schema,
 )
 from messgen.dynamic import (
+    BitsetConverter,
     Codec,
+    CodecOptions,
     DecimalConverter,
     EnumConverter,
+    JSONEncoder,
     MessgenError,
+    Record,
     ScalarConverter,
+    SequenceView,
+    StructView,
 )
 
 path_root = Path(__file__).parents[2]
@@ -256,6 +269,53 @@ def test_decimal_encoding():
         converter.serialize(123)
 
 
+def test_decimal_decoding_ignores_thread_context():
+    dec64_type = DecimalType(type="dec64", type_class=TypeClass.decimal, size=8)
+    converter = DecimalConverter({"dec64": dec64_type}, "dec64")
+
+    with localcontext() as ctx:
+        ctx.prec = 3
+        value = converter.deserialize(converter.serialize(Decimal("-123456.7890123456")))
+        assert value.as_tuple() == Decimal("-123456.7890123456").as_tuple()
+        assert converter.deserialize(converter.serialize(Decimal("-0E+5"))).as_tuple() == Decimal("-0E+5").as_tuple()
+
+
+def test_decimal_batch_decoding():
+    np = pytest.importorskip("numpy")
+
+    dec64_type = DecimalType(type="dec64", type_class=TypeClass.decimal, size=8)
+    converter = DecimalConverter({"dec64": dec64_type}, "dec64")
+
+    values = [Decimal("123456.7890123456"), Decimal("-0.05"), Decimal("0"), Decimal("1E+300"), Decimal("NaN"), Decimal("-Infinity")]
+    data = b"".join(converter.serialize(value) for value in values)
+
+    coefficients, exponents = converter.batch_components(data)
+    assert coefficients.dtype == np.int64 and exponents.dtype == np.int64
+    assert coefficients[:4].tolist() == [1234567890123456, -5, 0, 1]
+    assert exponents.tolist() == [-10, -2, 0, 300, converter.SPECIAL_EXPONENT, converter.SPECIAL_EXPONENT]
+
+    floats = converter.batch_floats(np.frombuffer(data, "<u8"))
+    assert floats[:4].tolist() == [float(value) for value in values[:4]]
+    assert np.isnan(floats[4])
+    assert floats[5] == -np.inf
+
+    # Zeros keep their sign whatever the exponent
+    floats = converter.batch_floats(b"".join(converter.serialize(Decimal(value)) for value in ["0E+310", "-0E+369", "0E-398"]))
+    assert floats.tolist() == [0.0, 0.0, 0.0]
+    assert np.signbit(floats).tolist() == [False, True, False]
+
+
+def test_decimal_converter_huge_coefficients():
+    dec64_type = DecimalType(type="dec64", type_class=TypeClass.decimal, size=8)
+    converter = DecimalConverter({"dec64": dec64_type}, "dec64")
+
+    # More digits than the int string conversion limit
+    digits = (1,) + (0,) * 5000 + (1,)
+    assert converter.serialize(Decimal((0, digits, 400))) == converter.serialize(Decimal("Infinity"))
+    assert converter.serialize(Decimal((1, digits, 400))) == converter.serialize(Decimal("-Infinity"))
+    assert converter.deserialize(converter.serialize(Decimal("1E+380"))) == Decimal("1E+380")
+
+
 def test_type_definition(codec):
     type_def = codec.type_definition("mynamespace/types/simple_struct")
     assert type_def.type == "mynamespace/types/simple_struct"
@@ -325,7 +385,7 @@ def test_enum_converter_serialization(codec):
         type_converter.serialize("NON_EXISTENT_VALUE")
 
 
-def _make_enum_converter(values, base_type="uint8", size=1):
+def _make_enum_converter(values, base_type="uint8", size=1, options=None):
     enum_type = EnumType(
         type="mynamespace/types/test_enum",
         type_class=TypeClass.enum,
@@ -334,7 +394,7 @@ def _make_enum_converter(values, base_type="uint8", size=1):
         values=values,
         size=size,
     )
-    return EnumConverter({enum_type.type: enum_type}, enum_type.type)
+    return EnumConverter({enum_type.type: enum_type}, enum_type.type, options=options)
 
 
 def test_enum_converter_hex_string_values():
@@ -393,6 +453,133 @@ def test_enum_converter_unknown_deserialize_value():
         converter.deserialize((9).to_bytes(length=1, byteorder="little"))
 
 
+@pytest.mark.parametrize("compile", [False, True])
+@pytest.mark.parametrize("base_type, size", [("int8", 1), ("uint8", 1), ("int32", 4)])
+def test_enum_converter_int_enum_mode(compile, base_type, size):
+    values = [
+        EnumValue(name="negative", value=-2, comment=""),
+        EnumValue(name="zero", value=0, comment=""),
+        EnumValue(name="seven", value=7, comment=""),
+    ]
+    if base_type == "uint8":
+        values = values[1:]
+    converter = _make_enum_converter(values, base_type=base_type, size=size, options=CodecOptions(enum_mode="int_enum"))
+    if compile:
+        converter.compile()
+
+    members = list(converter.int_enum)
+    assert [m.name for m in members] == [v.name for v in values]
+    assert converter.default_value() is members[0]
+
+    for member in members:
+        encoded = member.value.to_bytes(length=size, byteorder="little", signed=True)
+        assert converter.serialize(member) == encoded
+        assert converter.serialize(member.name) == encoded
+        assert converter.serialize(member.value) == encoded
+        decoded = converter.deserialize(encoded)
+        assert decoded is member and decoded == member.value
+
+    with pytest.raises(MessgenError):
+        converter.serialize("unknown")
+    with pytest.raises(MessgenError):
+        converter.serialize(5)
+    with pytest.raises(MessgenError):
+        converter.deserialize((5).to_bytes(length=size, byteorder="little"))
+
+
+@pytest.mark.parametrize("compile", [False, True])
+def test_enum_converter_name_mode_accepts_values(compile):
+    converter = _make_enum_converter([EnumValue(name="low", value=1, comment=""), EnumValue(name="high", value=200, comment="")])
+    if compile:
+        converter.compile()
+
+    assert converter.serialize(200) == converter.serialize("high") == b"\xc8"
+    assert converter.deserialize(b"\xc8") == "high"
+    with pytest.raises(MessgenError):
+        converter.deserialize(b"\x02")
+    with pytest.raises(MessgenError):
+        converter.deserialize(b"")
+
+
+def test_enum_mode_validation():
+    with pytest.raises(MessgenError):
+        CodecOptions(enum_mode="enum")
+
+
+@pytest.mark.parametrize("compile_converters", [False, True])
+def test_enum_json_is_independent_of_enum_mode(codec, compile_converters):
+    int_enum_codec = Codec(CodecOptions(enum_mode="int_enum"))
+    int_enum_codec.load_yaml(type_dirs=[path_root / "tests/msg/types"], compile_converters=compile_converters)
+    type_name = "mynamespace/types/subspace/complex_struct"
+    expected_bytes = (path_root / "tests/data/serialized/bin/complex_struct.bin").read_bytes()
+
+    msg = int_enum_codec.type_converter(type_name).deserialize(expected_bytes)
+    assert isinstance(msg["vec_enum"][0], enum.IntEnum)
+    expected_json = json.dumps(codec.type_converter(type_name).deserialize(expected_bytes), cls=JSONEncoder)
+    assert json.dumps(msg, cls=JSONEncoder) == expected_json
+
+
+@pytest.mark.parametrize("item_name", ["mro", "_x_", "_missing_", "__x__"])
+def test_enum_converter_int_enum_mode_reserved_names(item_name):
+    values = [EnumValue(name="zero", value=0, comment=""), EnumValue(name=item_name, value=1, comment="")]
+    with pytest.raises(MessgenError, match=item_name):
+        _make_enum_converter(values, options=CodecOptions(enum_mode="int_enum"))
+
+    # Such names are fine when enums are decoded as names
+    assert _make_enum_converter(values).deserialize(b"\x01") == item_name
+
+
+def _make_bitset_converter(options=None):
+    bitset_type = BitsetType(
+        type="mynamespace/types/test_bitset",
+        type_class=TypeClass.bitset,
+        base_type="uint64",
+        comment=None,
+        bits=[
+            BitsetBit(name="low", offset=0, comment=None),
+            BitsetBit(name="mid", offset=17, comment=None),
+            BitsetBit(name="high", offset=63, comment=None),
+        ],
+        size=8,
+    )
+    return BitsetConverter({bitset_type.type: bitset_type}, bitset_type.type, options=options)
+
+
+def test_bitset_converter_decoding():
+    converter = _make_bitset_converter()
+
+    assert converter.deserialize((0).to_bytes(8, "little")) == []
+    assert converter.deserialize((1 << 63 | 1 << 17 | 1 << 9 | 1).to_bytes(8, "little")) == ["low", "9", "mid", "high"]
+    assert converter.serialize(["high", "low"]) == (1 << 63 | 1).to_bytes(8, "little")
+    with pytest.raises(MessgenError):
+        converter.serialize(["non_existent_bit"])
+
+
+@pytest.mark.parametrize("bitset_mode,expected", [("int", 1 << 63 | 1 << 17), ("frozenset", frozenset({"mid", "high"}))])
+def test_bitset_converter_modes(bitset_mode, expected):
+    converter = _make_bitset_converter(CodecOptions(bitset_mode=bitset_mode))
+
+    data = (1 << 63 | 1 << 17).to_bytes(8, "little")
+    assert converter.deserialize(data) == expected
+
+    # Any form is accepted on encoding
+    assert converter.serialize(expected) == data
+    assert converter.serialize(["mid", "high"]) == data
+    assert converter.serialize(1 << 63 | 1 << 17) == data
+    assert converter.deserialize(converter.serialize(converter.default_value())) == converter.default_value()
+
+    # Compiled converters decode into the same form
+    codec_ = Codec(CodecOptions(bitset_mode=bitset_mode))
+    codec_.load_yaml(type_dirs=[path_root / "tests/msg/types"], compile_converters=True)
+    simple_struct_converter = codec_.type_converter("mynamespace/types/simple_struct")
+    b0 = simple_struct_converter.deserialize(simple_struct_converter.serialize({"b0": ["two", "error"]}))["b0"]
+    assert b0 == (0b110 if bitset_mode == "int" else frozenset({"two", "error"}))
+    assert json.loads(json.dumps({"b0": b0}, cls=JSONEncoder))["b0"] == (0b110 if bitset_mode == "int" else ["error", "two"])
+
+    with pytest.raises(MessgenError):
+        CodecOptions(bitset_mode="tuple")
+
+
 def test_type_converter_type_info(codec):
     struct_converter = codec.type_converter("mynamespace/types/simple_struct")
 
@@ -487,3 +674,719 @@ def test_type_schema_returns_valid_json(codec):
 def test_type_schema_matches_get_schema(codec):
     converter = codec.type_converter("mynamespace/types/simple_struct")
     assert converter.type_schema() == get_schema(converter.type_definition())
+
+
+def test_flat_struct_single_struct_layout(codec):
+    converter = codec.type_converter("mynamespace/types/flat_struct")
+    assert converter.flat_struct is not None
+    assert converter.flat_struct.size == converter.type_definition().size
+
+    expected_bytes = (path_root / "tests/data/serialized/bin/flat_struct.bin").read_bytes()
+    actual_msg = converter.deserialize(expected_bytes)
+    assert actual_msg["f0"] == 0x1234567890ABCDEF
+    assert actual_msg["f8"] == -0x12
+    assert converter.serialize(actual_msg) == expected_bytes
+
+    var_size_converter = codec.type_converter("mynamespace/types/var_size_struct")
+    assert var_size_converter.flat_struct is None
+
+
+def test_flat_struct_with_nested_types(codec, simple_struct):
+    converter = codec.type_converter("mynamespace/types/simple_struct")
+    assert converter.flat_struct is not None
+
+    msg = dict(simple_struct, b0=["one", "error"])
+    actual_msg = converter.deserialize(converter.serialize(msg))
+    assert actual_msg["e0"] == "another_value"
+    assert actual_msg["b0"] == ["one", "error"]
+    assert actual_msg["f4"] == 0
+
+    array_converter = codec.type_converter("mynamespace/types/simple_struct[2]")
+    assert array_converter.deserialize(array_converter.serialize([msg, msg])) == [actual_msg, actual_msg]
+
+    with pytest.raises(MessgenError):
+        converter.serialize(dict(simple_struct, e0="NON_EXISTENT_VALUE"))
+
+
+@pytest.mark.parametrize(
+    "type_name,file_name",
+    [
+        ("mynamespace/types/simple_struct", "simple_struct"),
+        ("mynamespace/types/var_size_struct", "var_size_struct"),
+        ("mynamespace/types/empty_struct", "empty_struct"),
+        ("mynamespace/types/flat_struct", "flat_struct"),
+        ("mynamespace/types/subspace/complex_struct", "complex_struct"),
+        ("mynamespace/types/complex_types_with_flat_groups", "complex_types_with_flat_groups"),
+    ],
+)
+def test_compiled_converters_match_interpretive(codec, type_name, file_name):
+    compiled_codec = Codec()
+    compiled_codec.load_yaml(type_dirs=[path_root / "tests/msg/types"], compile_converters=True)
+
+    expected_bytes = (path_root / f"tests/data/serialized/bin/{file_name}.bin").read_bytes()
+    expected_msg = codec.type_converter(type_name).deserialize(expected_bytes)
+
+    compiled_converter = compiled_codec.type_converter(type_name)
+    assert compiled_converter.deserialize(expected_bytes) == expected_msg
+    assert compiled_converter.serialize(expected_msg) == expected_bytes
+
+    with pytest.raises(MessgenError):
+        compiled_converter.deserialize(expected_bytes + b"\x00")
+
+
+def test_compiled_enum_errors(codec, simple_struct):
+    converter = codec.type_converter("mynamespace/types/simple_struct")
+    converter.compile()
+
+    with pytest.raises(MessgenError):
+        converter.serialize(dict(simple_struct, e0="NON_EXISTENT_VALUE"))
+
+    data = bytearray(converter.serialize(simple_struct))
+    data[-2] = 0x7F
+    with pytest.raises(MessgenError):
+        converter.deserialize(data)
+
+
+def test_serialize_into_preallocated_buffer(codec, simple_struct):
+    var_size_converter = codec.type_converter("mynamespace/types/var_size_struct")
+    var_size_msg = {
+        "f0": 0x1234567890ABCDEF,
+        "f1_vec": [-0x1234567890ABCDEF, 5, 1],
+        "str": "连接查询服务失败",
+    }
+    simple_converter = codec.type_converter("mynamespace/types/simple_struct")
+
+    buf = bytearray(1024)
+    offset = var_size_converter.serialize_into(var_size_msg, buf, 0)
+    assert bytes(buf[:offset]) == var_size_converter.serialize(var_size_msg)
+
+    end = simple_converter.serialize_into(simple_struct, memoryview(buf), offset)
+    assert bytes(buf[offset:end]) == simple_converter.serialize(simple_struct)
+    assert len(buf) == 1024
+
+    with pytest.raises(MessgenError):
+        var_size_converter.serialize_into(var_size_msg, bytearray(10))
+
+
+def test_deserialize_large_vector_and_truncated_data(codec):
+    type_def = codec.type_converter("mynamespace/types/var_size_struct")
+    expected_msg = {
+        "f0": 0x1234567890ABCDEF,
+        "f1_vec": list(range(-5000, 5000)),
+        "str": "Hello messgen!",
+    }
+
+    expected_bytes = type_def.serialize(expected_msg)
+    assert type_def.deserialize(expected_bytes) == expected_msg
+
+    for size in [4, 12, len(expected_bytes) - 1]:
+        with pytest.raises(MessgenError):
+            type_def.deserialize(expected_bytes[:size])
+
+
+def test_codec_converters_are_shared(codec):
+    complex_converter = codec.type_converter("mynamespace/types/subspace/complex_struct")
+    simple_converter = codec.type_converter("mynamespace/types/simple_struct")
+    uint32_converter = codec.type_converter("uint32")
+
+    fields = dict(complex_converter.fields)
+    assert fields["arr_simple_struct"].element_type is simple_converter
+    assert fields["vec_simple_struct"].element_type is simple_converter
+    assert fields["vec_float"] is codec.type_converter("float64[]")
+    assert fields["str"].size_type is uint32_converter
+    assert fields["map_str_by_int"].size_type is uint32_converter
+
+
+def test_protocol_indexes_are_cached():
+    codec_ = Codec()
+    codec_.load_yaml(
+        type_dirs=[path_root / "tests/msg/types"],
+        protocols=[
+            f"{path_root}/tests/msg/protocols:mynamespace/proto/test_proto",
+            f"{path_root}/tests/msg/protocols:mynamespace/proto/subspace/another_proto",
+        ],
+    )
+
+    message_info = codec_.message_info_by_id(1, 0)
+    assert message_info is codec_.message_info_by_name("mynamespace/proto/test_proto", "simple_struct")
+    assert message_info is codec_.protocol_info_by_id(1).message_info_by_id(0)
+
+    another_message_info = codec_.message_info_by_id(2, 0)
+    assert another_message_info.proto_name() == "mynamespace/proto/subspace/another_proto"
+    assert another_message_info.type_converter() is message_info.type_converter()
+    assert another_message_info.message_hash() != message_info.message_hash()
+
+    assert codec_.protocol_info_by_id(2) is codec_.protocol_info_by_name("mynamespace/proto/subspace/another_proto")
+    assert codec_.protocol_info_by_id(2).proto_hash() == another_message_info.message_hash()
+
+    with pytest.raises(MessgenError):
+        codec_.message_info_by_id(1, 3)
+    with pytest.raises(MessgenError):
+        codec_.message_info_by_id(3, 0)
+    with pytest.raises(MessgenError):
+        codec_.protocol_info_by_id(1).message_info_by_name("non_existent_message")
+
+
+def test_dispatch_to_registered_handlers(codec, simple_struct):
+    received = []
+    codec.register_handler("mynamespace/proto/test_proto", "simple_struct", received.append)
+
+    message_info = codec.message_info_by_name("mynamespace/proto/test_proto", "simple_struct")
+    payload = message_info.type_converter().serialize(simple_struct)
+
+    assert codec.dispatch(message_info.proto_id(), message_info.message_id(), payload)
+    assert len(received) == 1
+    assert received[0]["f3"] == simple_struct["f3"]
+
+    # Unknown and unhandled messages are skipped without decoding the payload
+    assert not codec.dispatch(message_info.proto_id(), 1, b"garbage")
+    assert not codec.dispatch(42, message_info.message_id(), b"garbage")
+    assert len(received) == 1
+
+    codec.unregister_handler(message_info.proto_id(), message_info.message_id())
+    assert not codec.dispatch(message_info.proto_id(), message_info.message_id(), payload)
+
+    with pytest.raises(MessgenError):
+        codec.register_handler("mynamespace/proto/test_proto", "non_existent_message", received.append)
+
+
+@pytest.mark.parametrize("compile_converters", [False, True])
+def test_numpy_vectors_and_arrays(codec, compile_converters):
+    np = pytest.importorskip("numpy")
+
+    numpy_codec = Codec(CodecOptions(numpy=True))
+    numpy_codec.load_yaml(type_dirs=[path_root / "tests/msg/types"], compile_converters=compile_converters)
+    type_name = "mynamespace/types/subspace/complex_struct"
+    converter = numpy_codec.type_converter(type_name)
+
+    expected_bytes = (path_root / "tests/data/serialized/bin/complex_struct.bin").read_bytes()
+    expected_msg = codec.type_converter(type_name).deserialize(expected_bytes)
+
+    msg = converter.deserialize(expected_bytes)
+    assert isinstance(msg["vec_float"], np.ndarray)
+    assert msg["vec_float"].dtype == np.dtype("<f8")
+    assert np.shares_memory(msg["vec_float"], np.frombuffer(expected_bytes, np.uint8))
+    assert msg["vec_float"].tolist() == expected_msg["vec_float"]
+    assert msg["arr_int"].tolist() == expected_msg["arr_int"]
+
+    # Enum elements are decoded as raw values
+    enum_converter = numpy_codec.type_converter("mynamespace/types/simple_enum")
+    assert [enum_converter.mapping[v] for v in msg["vec_enum"].tolist()] == expected_msg["vec_enum"]
+
+    assert converter.serialize(msg) == expected_bytes
+    assert converter.serialize(expected_msg) == expected_bytes
+
+    # Any ndarray is converted to the wire dtype
+    msg["vec_float"] = np.array(expected_msg["vec_float"], dtype=np.float32)
+    msg["arr_int"] = np.array(expected_msg["arr_int"], dtype=">i8")
+    actual_msg = converter.deserialize(converter.serialize(msg))
+    assert actual_msg["vec_float"].tolist() == msg["vec_float"].tolist()
+    assert actual_msg["arr_int"].tolist() == expected_msg["arr_int"]
+
+    with pytest.raises(MessgenError):
+        converter.deserialize(expected_bytes[:-20])
+
+    # Only 1-D ndarrays are serialized, other shapes don't match the size prefix of the elements
+    for field_name, value in [("vec_float", np.zeros((2, 3))), ("arr_int", np.zeros((4, 2), dtype=np.int64))]:
+        msg = dict(expected_msg, **{field_name: value})
+        with pytest.raises(MessgenError):
+            converter.serialize(msg)
+        with pytest.raises(MessgenError):
+            converter.serialize_into(msg, bytearray(4096))
+        with pytest.raises(MessgenError):
+            converter.serialize_iov(msg, min_segment_size=1)
+
+
+def test_dispatch_to_coroutine_handlers(codec, simple_struct):
+    received = []
+
+    async def on_simple_struct(message):
+        await asyncio.sleep(0)
+        received.append(message)
+
+    codec.register_handler("mynamespace/proto/test_proto", "simple_struct", on_simple_struct)
+    message_info = codec.message_info_by_name("mynamespace/proto/test_proto", "simple_struct")
+    payload = bytearray(message_info.type_converter().serialize(simple_struct))
+
+    async def run():
+        assert codec.dispatch(message_info.proto_id(), message_info.message_id(), payload)
+        # The message is decoded from a copy, the payload buffer may be reused once dispatch returns
+        payload[:] = bytes(len(payload))
+        while not received:
+            await asyncio.sleep(0)
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert received[0]["f3"] == simple_struct["f3"]
+
+    # Coroutine handlers can't be dispatched without a running event loop
+    with pytest.raises(MessgenError):
+        codec.dispatch(message_info.proto_id(), message_info.message_id(), payload)
+
+
+def test_decode_batch(codec, simple_struct):
+    np = pytest.importorskip("numpy")
+
+    converter = codec.type_converter("mynamespace/types/simple_struct")
+    messages = [dict(simple_struct, f3=i, f5=i / 2, e0="one_value" if i % 2 else "another_value") for i in range(10)]
+    payloads = [converter.serialize(msg) for msg in messages]
+
+    records = converter.decode_batch(payloads)
+    assert records.shape == (10,)
+    assert records.dtype.itemsize == converter.type_definition().size
+    assert records["f3"].tolist() == list(range(10))
+    assert records["f5"].tolist() == [i / 2 for i in range(10)]
+    assert records["f0"][0] == simple_struct["f0"]
+
+    # Enums are decoded as raw values
+    enum_converter = codec.type_converter("mynamespace/types/simple_enum")
+    assert [enum_converter.mapping[v] for v in records["e0"].tolist()] == [msg["e0"] for msg in messages]
+
+    columns = converter.decode_batch(payloads, columns=True)
+    assert list(columns) == [name for name, _ in converter.fields]
+    assert np.array_equal(columns["f3"], records["f3"])
+
+    array_converter = codec.type_converter("mynamespace/types/simple_struct[2]")
+    array_records = array_converter.decode_batch([array_converter.serialize(messages[:2]), array_converter.serialize(messages[2:4])])
+    assert array_records.shape == (2, 2)
+    assert array_records["f3"].tolist() == [[0, 1], [2, 3]]
+
+    assert len(converter.decode_batch([])) == 0
+
+    with pytest.raises(MessgenError):
+        converter.decode_batch(payloads + [payloads[0][:-1]])
+    with pytest.raises(MessgenError):
+        codec.type_converter("mynamespace/types/var_size_struct").decode_batch(payloads)
+
+
+def _materialize(value):
+    if isinstance(value, StructView):
+        return {key: _materialize(item) for key, item in value.items()}
+    if isinstance(value, SequenceView):
+        return [_materialize(item) for item in value]
+    return value
+
+
+@pytest.mark.parametrize(
+    "type_name,file_name",
+    [
+        ("mynamespace/types/simple_struct", "simple_struct"),
+        ("mynamespace/types/var_size_struct", "var_size_struct"),
+        ("mynamespace/types/empty_struct", "empty_struct"),
+        ("mynamespace/types/subspace/complex_struct", "complex_struct"),
+        ("mynamespace/types/complex_types_with_flat_groups", "complex_types_with_flat_groups"),
+    ],
+)
+def test_view_matches_deserialize(codec, type_name, file_name):
+    converter = codec.type_converter(type_name)
+    expected_bytes = (path_root / f"tests/data/serialized/bin/{file_name}.bin").read_bytes()
+
+    view = converter.view(expected_bytes)
+    assert isinstance(view, StructView)
+    assert _materialize(view) == converter.deserialize(expected_bytes)
+
+
+def test_view_decodes_fields_lazily(codec):
+    converter = codec.type_converter("mynamespace/types/subspace/complex_struct")
+    expected_bytes = (path_root / "tests/data/serialized/bin/complex_struct.bin").read_bytes()
+    expected_msg = converter.deserialize(expected_bytes)
+
+    # Fields after the variable size ones are reached without decoding them
+    view = converter.view(expected_bytes)
+    assert view["str"] == expected_msg["str"]
+    assert view["array_of_size_zero"] == expected_msg["array_of_size_zero"]
+
+    vec_simple_struct = view["vec_simple_struct"]
+    assert isinstance(vec_simple_struct, SequenceView)
+    assert len(vec_simple_struct) == len(expected_msg["vec_simple_struct"])
+    assert vec_simple_struct[-1]["f3"] == expected_msg["vec_simple_struct"][-1]["f3"]
+
+    arr_var_size_struct = view["arr_var_size_struct"]
+    assert arr_var_size_struct[1]["str"] == expected_msg["arr_var_size_struct"][1]["str"]
+    with pytest.raises(IndexError):
+        arr_var_size_struct[2]
+
+    with pytest.raises(KeyError):
+        view["non_existent_field"]
+
+    # Truncated data is only detected when the missing part is accessed
+    truncated_view = converter.view(expected_bytes[:64])
+    assert truncated_view["bitset0"] == expected_msg["bitset0"]
+    assert "str" in truncated_view
+    assert "non_existent_field" not in truncated_view
+    with pytest.raises(MessgenError):
+        truncated_view["str"]
+
+
+@pytest.mark.parametrize("compile_converters", [False, True])
+def test_projection(compile_converters):
+    codec_ = Codec()
+    codec_.load_yaml(type_dirs=[path_root / "tests/msg/types"], compile_converters=compile_converters)
+    converter = codec_.type_converter("mynamespace/types/subspace/complex_struct")
+    expected_bytes = (path_root / "tests/data/serialized/bin/complex_struct.bin").read_bytes()
+    expected_msg = converter.deserialize(expected_bytes)
+
+    projection = converter.projection(["str", "bitset0", "vec_float"])
+    assert projection is converter.projection(["str", "bitset0", "vec_float"])
+    assert projection.deserialize(expected_bytes) == {
+        "bitset0": expected_msg["bitset0"],
+        "vec_float": expected_msg["vec_float"],
+        "str": expected_msg["str"],
+    }
+
+    # Nested struct fields are selected with dotted paths
+    assert converter.deserialize(expected_bytes, fields=["arr_simple_struct", "map_str_by_int"]) == {
+        "arr_simple_struct": expected_msg["arr_simple_struct"],
+        "map_str_by_int": expected_msg["map_str_by_int"],
+    }
+
+    with pytest.raises(MessgenError):
+        converter.projection(["non_existent_field"])
+    with pytest.raises(MessgenError):
+        converter.projection(["str.length"])
+    with pytest.raises(MessgenError):
+        projection.deserialize(expected_bytes[:64])
+    with pytest.raises(MessgenError):
+        codec_.type_converter("int32").projection(["a"])
+
+
+@pytest.mark.parametrize("compile_converters", [False, True])
+def test_projection_of_truncated_data(compile_converters):
+    codec_ = Codec()
+    codec_.load_yaml(type_dirs=[path_root / "tests/msg/types"], compile_converters=compile_converters)
+    converter = codec_.type_converter("mynamespace/types/subspace/complex_struct")
+    data = (path_root / "tests/data/serialized/bin/complex_struct.bin").read_bytes()
+    expected_msg = converter.deserialize(data)
+
+    for fields in [["str"], ["bs"], ["vec_simple_struct"], ["vec_float", "vec_arr_vec_int"], ["str_vec", "map_vec_by_str"]]:
+        # Every field is either decoded completely or the projection fails, never truncated
+        decoded_from = None
+        for k in range(len(data) + 1):
+            try:
+                msg = converter.deserialize(data[:k], fields=fields)
+            except MessgenError:
+                assert decoded_from is None
+                continue
+            assert msg == {field_name: expected_msg[field_name] for field_name in fields}
+            decoded_from = k if decoded_from is None else decoded_from
+        assert decoded_from is not None and decoded_from > 0
+
+
+def test_projection_of_nested_struct_fields(tmp_path, simple_struct):
+    (tmp_path / "outer_struct.yaml").write_text(
+        "type_class: struct\n"
+        "fields:\n"
+        '  - { name: "str", type: "string" }\n'
+        '  - { name: "inner", type: "mynamespace/types/simple_struct" }\n'
+        '  - { name: "var_inner", type: "mynamespace/types/var_size_struct" }\n'
+        '  - { name: "f0", type: "uint32" }\n'
+    )
+    codec_ = Codec()
+    codec_.load_yaml(type_dirs=[path_root / "tests/msg/types", tmp_path])
+    converter = codec_.type_converter("outer_struct")
+
+    msg = {
+        "str": "abc",
+        "inner": simple_struct,
+        "var_inner": {"f0": 1, "f1_vec": [2, 3], "str": "def"},
+        "f0": 0x12345678,
+    }
+    data = converter.serialize(msg)
+
+    assert converter.deserialize(data, fields=["inner.f3", "var_inner.str", "f0"]) == {
+        "inner": {"f3": simple_struct["f3"]},
+        "var_inner": {"str": "def"},
+        "f0": 0x12345678,
+    }
+    assert converter.deserialize(data, fields=["var_inner.f0", "var_inner"]) == {"var_inner": msg["var_inner"]}
+
+
+def _record_to_dict(value):
+    if isinstance(value, Record):
+        return {key: _record_to_dict(item) for key, item in value._asdict().items()}
+    if isinstance(value, list):
+        return [_record_to_dict(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _record_to_dict(item) for key, item in value.items()}
+    return value
+
+
+@pytest.mark.parametrize("compile_converters", [False, True])
+@pytest.mark.parametrize(
+    "type_name,file_name",
+    [
+        ("mynamespace/types/simple_struct", "simple_struct"),
+        ("mynamespace/types/var_size_struct", "var_size_struct"),
+        ("mynamespace/types/empty_struct", "empty_struct"),
+        ("mynamespace/types/flat_struct", "flat_struct"),
+        ("mynamespace/types/subspace/complex_struct", "complex_struct"),
+        ("mynamespace/types/complex_types_with_flat_groups", "complex_types_with_flat_groups"),
+    ],
+)
+def test_record_classes(codec, type_name, file_name, compile_converters):
+    records_codec = Codec(CodecOptions(records=True))
+    records_codec.load_yaml(type_dirs=[path_root / "tests/msg/types"], compile_converters=compile_converters)
+    converter = records_codec.type_converter(type_name)
+
+    expected_bytes = (path_root / f"tests/data/serialized/bin/{file_name}.bin").read_bytes()
+    expected_msg = codec.type_converter(type_name).deserialize(expected_bytes)
+
+    record = converter.deserialize(expected_bytes)
+    assert isinstance(record, converter.record_class)
+    assert not hasattr(record, "__dict__")
+    assert _record_to_dict(record) == expected_msg
+    assert converter.serialize(record) == expected_bytes
+    assert converter.serialize(expected_msg) == expected_bytes
+    assert converter.record_class(*record._asdict().values()) == record
+
+
+def test_record_class_fields(simple_struct):
+    records_codec = Codec(CodecOptions(records=True))
+    records_codec.load_yaml(type_dirs=[path_root / "tests/msg/types"])
+    converter = records_codec.type_converter("mynamespace/types/simple_struct")
+
+    record = converter.deserialize(converter.serialize(simple_struct))
+    assert type(record).__name__ == "simple_struct"
+    assert record.f3 == record["f3"] == simple_struct["f3"]
+    assert json.loads(json.dumps(record, cls=JSONEncoder))["e0"] == simple_struct["e0"]
+    assert converter.default_value() == converter.record_class(*(field_type.default_value() for _, field_type in converter.fields))
+
+    record.f3 = 42
+    assert converter.deserialize(converter.serialize(record)).f3 == 42
+    with pytest.raises(AttributeError):
+        record.non_existent_field = 1
+
+
+def test_record_class_field_named_like_self(tmp_path):
+    (tmp_path / "self_struct.yaml").write_text(
+        "type_class: struct\n"
+        "fields:\n"
+        '  - { name: "_self", type: "int32" }\n'
+        '  - { name: "__self__", type: "int32" }\n'
+    )
+    records_codec = Codec(CodecOptions(records=True))
+    records_codec.load_yaml(type_dirs=[tmp_path])
+    converter = records_codec.type_converter("self_struct")
+
+    record = converter.deserialize(converter.serialize({"_self": 1, "__self__": 2}))
+    assert record._asdict() == {"_self": 1, "__self__": 2}
+
+    # Private names would be mangled by the record class
+    (tmp_path / "self_struct.yaml").write_text(
+        "type_class: struct\n"
+        "fields:\n"
+        '  - { name: "__self", type: "int32" }\n'
+    )
+    with pytest.raises(MessgenError):
+        Codec(CodecOptions(records=True)).load_yaml(type_dirs=[tmp_path])
+
+
+@pytest.mark.parametrize(
+    "type_name,file_name",
+    [
+        ("mynamespace/types/simple_struct", "simple_struct"),
+        ("mynamespace/types/var_size_struct", "var_size_struct"),
+        ("mynamespace/types/empty_struct", "empty_struct"),
+        ("mynamespace/types/flat_struct", "flat_struct"),
+        ("mynamespace/types/subspace/complex_struct", "complex_struct"),
+        ("mynamespace/types/complex_types_with_flat_groups", "complex_types_with_flat_groups"),
+    ],
+)
+def test_serialized_size(codec, type_name, file_name):
+    converter = codec.type_converter(type_name)
+    expected_bytes = (path_root / f"tests/data/serialized/bin/{file_name}.bin").read_bytes()
+    msg = converter.deserialize(expected_bytes)
+
+    assert converter.serialized_size(msg) == len(expected_bytes)
+    assert converter.min_size() <= len(expected_bytes)
+    if (max_size := converter.max_size()) is not None:
+        assert len(expected_bytes) <= max_size
+
+
+@pytest.mark.parametrize("compile", [False, True])
+@pytest.mark.parametrize(
+    "type_name,file_name",
+    [
+        ("mynamespace/types/simple_struct", "simple_struct"),
+        ("mynamespace/types/var_size_struct", "var_size_struct"),
+        ("mynamespace/types/flat_struct", "flat_struct"),
+        ("mynamespace/types/subspace/complex_struct", "complex_struct"),
+        ("mynamespace/types/complex_types_with_flat_groups", "complex_types_with_flat_groups"),
+    ],
+)
+def test_absent_fields_serialize_as_defaults(codec, compile, type_name, file_name):
+    converter = codec.type_converter(type_name)
+    msg = converter.deserialize((path_root / f"tests/data/serialized/bin/{file_name}.bin").read_bytes())
+    if compile:
+        converter.compile()
+
+    partial = {field_name: value for i, (field_name, value) in enumerate(msg.items()) if i % 2}
+    filled = dict(partial)
+    for field_name, field_type in converter.fields:
+        assert field_type.default_bytes() == field_type.serialize(field_type.default_value())
+        filled.setdefault(field_name, field_type.default_value())
+
+    expected = converter.serialize(filled)
+    assert converter.serialize(partial) == expected
+    assert converter.serialized_size(partial) == len(expected)
+    assert b"".join(converter.serialize_iov(partial)) == expected
+
+
+def test_size_bounds(codec):
+    simple_struct_size = codec.type_definition("mynamespace/types/simple_struct").size
+    assert codec.type_converter("mynamespace/types/simple_struct").min_size() == simple_struct_size
+    assert codec.type_converter("mynamespace/types/simple_struct").max_size() == simple_struct_size
+    assert codec.type_converter("mynamespace/types/simple_struct[2]").max_size() == 2 * simple_struct_size
+    assert codec.type_converter("mynamespace/types/empty_struct").max_size() == 0
+    assert codec.type_converter("int32[0]").max_size() == 0
+
+    # Variable size types are bounded only from below by their length prefixes
+    assert codec.type_converter("string").min_size() == 4
+    assert codec.type_converter("string").max_size() is None
+    assert codec.type_converter("int16[][4]").min_size() == 16
+    assert codec.type_converter("mynamespace/types/var_size_struct").min_size() == 16
+    assert codec.type_converter("mynamespace/types/var_size_struct").max_size() is None
+    assert codec.type_converter("mynamespace/types/var_size_struct[2]").min_size() == 32
+
+
+def test_serialize_iov(codec):
+    converter = codec.type_converter("mynamespace/types/subspace/complex_struct")
+    expected_bytes = (path_root / "tests/data/serialized/bin/complex_struct.bin").read_bytes()
+    msg = converter.deserialize(expected_bytes)
+
+    # Small messages are coalesced into a single segment
+    assert converter.serialize_iov(msg) == [expected_bytes]
+
+    blob = bytes(range(256)) * 64
+    msg["bs"] = blob
+    msg["arr_var_size_struct"][1]["str"] = "x" * 10000
+    segments = converter.serialize_iov(msg)
+    assert b"".join(segments) == converter.serialize(msg)
+    assert len(segments) == 3
+    assert segments[1] is blob
+
+    msg["bs"] = memoryview(bytearray(blob))
+    segments = converter.serialize_iov(msg, min_segment_size=len(blob) + 1)
+    assert b"".join(segments) == converter.serialize(dict(msg, bs=blob))
+    assert len(segments) == 1
+
+
+@pytest.mark.parametrize("compile_converters", [False, True])
+def test_bytes_from_buffers_of_wider_items(compile_converters):
+    codec_ = Codec()
+    codec_.load_yaml(type_dirs=[path_root / "tests/msg/types"], compile_converters=compile_converters)
+    converter = codec_.type_converter("mynamespace/types/subspace/complex_struct")
+    msg = converter.deserialize((path_root / "tests/data/serialized/bin/complex_struct.bin").read_bytes())
+
+    # Buffers are serialized as their bytes whatever their item size
+    msg["bs"] = array.array("H", [1, 2, 3])
+    expected_bytes = converter.serialize(dict(msg, bs=msg["bs"].tobytes()))
+    assert converter.serialize(msg) == expected_bytes
+    assert converter.serialized_size(msg) == len(expected_bytes)
+    assert b"".join(converter.serialize_iov(msg, min_segment_size=1)) == expected_bytes
+
+    buf = bytearray(len(expected_bytes))
+    assert converter.serialize_into(msg, buf) == len(expected_bytes)
+    assert buf == expected_bytes
+
+
+def test_serialize_iov_passes_ndarrays_through(codec):
+    np = pytest.importorskip("numpy")
+
+    numpy_codec = Codec(CodecOptions(numpy=True))
+    numpy_codec.load_yaml(type_dirs=[path_root / "tests/msg/types"])
+    converter = numpy_codec.type_converter("mynamespace/types/subspace/complex_struct")
+    expected_bytes = (path_root / "tests/data/serialized/bin/complex_struct.bin").read_bytes()
+    msg = converter.deserialize(expected_bytes)
+
+    vec_float = np.arange(10000, dtype=np.float64)
+    msg["vec_float"] = vec_float
+    segments = converter.serialize_iov(msg)
+    assert b"".join(segments) == converter.serialize(msg)
+    assert any(isinstance(segment, memoryview) and np.shares_memory(segment, vec_float) for segment in segments)
+
+
+@pytest.mark.parametrize("compile_converters", [False, True])
+def test_bytes_view(codec, compile_converters):
+    view_codec = Codec(CodecOptions(bytes_view=True))
+    view_codec.load_yaml(type_dirs=[path_root / "tests/msg/types"], compile_converters=compile_converters)
+    converter = view_codec.type_converter("mynamespace/types/subspace/complex_struct")
+
+    expected_bytes = (path_root / "tests/data/serialized/bin/complex_struct.bin").read_bytes()
+    expected_msg = codec.type_converter("mynamespace/types/subspace/complex_struct").deserialize(expected_bytes)
+
+    data = bytearray(expected_bytes)
+    msg = converter.deserialize(data)
+    assert isinstance(msg["bs"], memoryview)
+    assert msg["bs"] == expected_msg["bs"]
+    assert json.loads(json.dumps(msg, cls=JSONEncoder))["bs"] == f"0x{expected_msg['bs'].hex()}"
+    assert converter.serialize(msg) == expected_bytes
+
+    # Slices refer to the input buffer
+    offset = expected_bytes.index(expected_msg["bs"])
+    data[offset] ^= 0xFF
+    assert msg["bs"][0] == data[offset]
+
+    with pytest.raises(MessgenError):
+        converter.deserialize(expected_bytes[:-1])
+
+
+@pytest.mark.parametrize("compile_converters", [False, True])
+def test_bytes_view_map_keys(tmp_path, compile_converters):
+    (tmp_path / "bytes_map_struct.yaml").write_text(
+        "type_class: struct\n"
+        "fields:\n"
+        '  - { name: "by_bytes", type: "int32{bytes}" }\n'
+    )
+    view_codec = Codec(CodecOptions(bytes_view=True))
+    view_codec.load_yaml(type_dirs=[tmp_path], compile_converters=compile_converters)
+    converter = view_codec.type_converter("bytes_map_struct")
+
+    msg = {"by_bytes": {b"a": 1, b"bc": 2}}
+    decoded = converter.deserialize(bytearray(converter.serialize(msg)))
+    assert decoded == msg
+    assert all(type(key) is bytes for key in decoded["by_bytes"])
+
+
+@pytest.mark.parametrize("compile_converters", [False, True])
+def test_struct_with_external_field(tmp_path, compile_converters):
+    (tmp_path / "ext_type.yaml").write_text("type_class: external\n")
+    (tmp_path / "ext_struct.yaml").write_text(
+        "type_class: struct\n"
+        "fields:\n"
+        '  - { name: "f0", type: "int32" }\n'
+        '  - { name: "ext", type: "ext_type" }\n'
+    )
+    (tmp_path / "flat_struct.yaml").write_text(
+        "type_class: struct\n"
+        "fields:\n"
+        '  - { name: "f0", type: "int32" }\n'
+        '  - { name: "f1", type: "int64" }\n'
+    )
+    (tmp_path / "outer_struct.yaml").write_text(
+        "type_class: struct\n"
+        "fields:\n"
+        '  - { name: "f0", type: "int16" }\n'
+        '  - { name: "f1", type: "flat_struct" }\n'
+    )
+    codec_ = Codec()
+    codec_.load_yaml(type_dirs=[tmp_path], compile_converters=compile_converters)
+    converter = codec_.type_converter("ext_struct")
+
+    # External types fail only when they are serialized
+    with pytest.raises(RuntimeError):
+        converter.serialize({"f0": 1})
+
+    # Defaults of missing fields next to the external struct are unaffected
+    converter = codec_.type_converter("outer_struct")
+    assert converter.serialize({}) == struct.pack("<hiq", 0, 0, 0)
+    assert converter.serialize({"f1": {"f0": 7}}) == struct.pack("<hiq", 0, 7, 0)
+
+
+def test_flat_layout_only_for_flat_types(codec):
+    assert codec.type_converter("int32").flat_fmt == "i"
+    converter = codec.type_converter("string")
+    assert converter.flat_fmt is None
+    with pytest.raises(MessgenError):
+        converter._flatten("value", [])
+    with pytest.raises(MessgenError):
+        converter._unflatten(("value",), 0)
@@ -0,0 +1,293 @@
+import asyncio
+import io
+import pytest
+import random
+import socket
+
+from pathlib import Path
+
+from messgen.dynamic import (
+    Codec,
+    CodecOptions,
+    MessgenError,
+)
+from messgen.frames import (
+    FrameDecoder,
+    FrameHeader,
+    FrameReader,
+    MappedFrameReader,
+)
+from messgen.frames_asyncio import (
+    AsyncFrameReader,
+    FrameProtocol,
+    FrameWriter,
+)
+
+path_root = Path(__file__).parents[2]
+
+
+@pytest.mark.parametrize("block_size", [7, 64, 1 << 20])
+@pytest.mark.parametrize("from_file", [False, True])
+def test_frame_reader(codec, block_size, from_file, recorded_frames):
+    frames = recorded_frames
+    data = b"".join(FrameHeader().pack(proto_id, message_id, len(payload)) + payload for proto_id, message_id, payload in frames)
+    source = io.BytesIO(data) if from_file else data
+
+    reader = FrameReader(source, codec, block_size=block_size)
+    assert [(proto_id, message_id, bytes(payload)) for proto_id, message_id, payload in reader] == frames
+
+    if from_file:
+        source.seek(0)
+    expected = [(proto_id, message_id, codec.message_info_by_id(proto_id, message_id).type_converter().deserialize(payload))
+                for proto_id, message_id, payload in frames]
+    assert list(reader.messages()) == expected
+
+
+def test_frame_reader_custom_header(codec, recorded_frames):
+    # Big-endian header with a message id before the protocol id and a timestamp ignored by the reader
+    header = FrameHeader(">BHIQ", ["message_id", "proto_id", "size", "timestamp"])
+    assert header.size == 15
+    frames = recorded_frames
+    data = b"".join(header.pack(proto_id, message_id, len(payload)) + payload for proto_id, message_id, payload in frames)
+    assert data[:3] == b"\x00\x00\x01"
+
+    assert [(proto_id, message_id, bytes(payload)) for proto_id, message_id, payload in FrameReader(io.BytesIO(data), header=header)] == frames
+
+    with pytest.raises(MessgenError):
+        FrameHeader("<HI", ["proto_id", "size"])
+    with pytest.raises(MessgenError):
+        FrameHeader("<HHI", ["proto_id", "message_id"])
+
+
+@pytest.mark.parametrize("from_file", [False, True])
+def test_frame_reader_truncated_frames(codec, from_file):
+    payload = b"\x01" * 10
+    data = FrameHeader().pack(1, 0, len(payload)) + payload
+    for truncated in [data[:-1], data + data[:3]]:
+        reader = FrameReader(io.BytesIO(truncated) if from_file else truncated, codec, block_size=4)
+        with pytest.raises(MessgenError):
+            list(reader)
+
+    # Unknown messages fail only when decoded
+    data = FrameHeader().pack(1, 3, len(payload)) + payload
+    assert len(list(FrameReader(data))) == 1
+    with pytest.raises(MessgenError):
+        list(FrameReader(data, codec).messages())
+
+
+@pytest.mark.parametrize("buffer_size", [1, 16, 1 << 16])
+def test_frame_decoder_feed(codec, buffer_size, recorded_frames):
+    frames = recorded_frames
+    data = b"".join(FrameHeader().pack(proto_id, message_id, len(payload)) + payload for proto_id, message_id, payload in frames)
+
+    rng = random.Random(buffer_size)
+    for max_chunk in [1, 5, 100, len(data)]:
+        decoder = FrameDecoder(buffer_size=buffer_size)
+        received = []
+        offset = 0
+        while offset < len(data):
+            n = rng.randint(1, max_chunk)
+            received += [(proto_id, message_id, bytes(payload)) for proto_id, message_id, payload in decoder.feed(data[offset:offset + n])]
+            offset += n
+        assert received == frames
+        assert decoder.pending() == 0
+
+    decoder = FrameDecoder(buffer_size=buffer_size)
+    assert len(decoder.feed(data[:-1])) == len(frames) - 1
+    assert decoder.pending() == FrameHeader().size + len(frames[-1][2]) - 1
+
+
+def test_frame_decoder_recv_into(codec, recorded_frames):
+    frames = recorded_frames
+    data = b"".join(FrameHeader().pack(proto_id, message_id, len(payload)) + payload for proto_id, message_id, payload in frames)
+
+    decoder = FrameDecoder(buffer_size=32)
+    received = []
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(data + data[:5])
+        left.shutdown(socket.SHUT_WR)
+        with pytest.raises(MessgenError):
+            while (chunk := decoder.recv_into(right)) is not None:
+                received += [(proto_id, message_id, bytes(payload)) for proto_id, message_id, payload in chunk]
+    assert received == frames
+
+    decoder = FrameDecoder()
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(data)
+        left.shutdown(socket.SHUT_WR)
+        received = []
+        while (chunk := decoder.recv_into(right)) is not None:
+            received += [(proto_id, message_id, bytes(payload)) for proto_id, message_id, payload in chunk]
+    assert received == frames
+
+
+def test_async_frame_reader(codec, recorded_frames):
+    frames = recorded_frames
+    data = b"".join(FrameHeader().pack(proto_id, message_id, len(payload)) + payload for proto_id, message_id, payload in frames)
+
+    async def read(data, decode):
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        frame_reader = AsyncFrameReader(reader, codec, buffer_size=16)
+        if decode:
+            return [frame async for frame in frame_reader.messages()]
+        return [(proto_id, message_id, bytes(payload)) async for proto_id, message_id, payload in frame_reader]
+
+    assert asyncio.run(read(data, False)) == frames
+    expected = [(proto_id, message_id, codec.message_info_by_id(proto_id, message_id).type_converter().deserialize(payload))
+                for proto_id, message_id, payload in frames]
+    assert asyncio.run(read(data, True)) == expected
+
+    with pytest.raises(MessgenError):
+        asyncio.run(read(data[:-1], False))
+
+
+def test_frame_writer_batches_writes(codec, simple_struct):
+    class Transport:
+        def __init__(self):
+            self.writes = []
+
+        def writelines(self, data):
+            self.writes.append(b"".join(data))
+
+    async def write():
+        transport = Transport()
+        writer = FrameWriter(transport, codec)
+        writer.write_message("mynamespace/proto/test_proto", "simple_struct", simple_struct)
+        writer.write_message(1, 4, {})
+        writer.write(1, 2, b"\x01\x02")
+        assert transport.writes == []
+        await asyncio.sleep(0)
+        writer.write_message(1, "empty_struct", {})
+        writer.flush()
+        await asyncio.sleep(0)
+        return transport.writes
+
+    writes = asyncio.run(write())
+    assert len(writes) == 2
+    simple_struct_bytes = codec.message_info_by_name("mynamespace/proto/test_proto", "simple_struct").type_converter().serialize(simple_struct)
+    assert [(proto_id, message_id, bytes(payload)) for proto_id, message_id, payload in FrameReader(writes[0])] == [
+        (1, 0, simple_struct_bytes),
+        (1, 4, b""),
+        (1, 2, b"\x01\x02"),
+    ]
+    assert writes[1] == FrameHeader().pack(1, 4, 0)
+
+
+def test_frame_protocol_dispatches_to_handlers(codec, simple_struct):
+    received = []
+
+    async def on_empty_struct(message):
+        await asyncio.sleep(0)
+        received.append(("empty_struct", message))
+
+    codec.register_handler("mynamespace/proto/test_proto", "simple_struct", lambda message: received.append(("simple_struct", message)))
+    codec.register_handler("mynamespace/proto/test_proto", "empty_struct", on_empty_struct)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        left, right = socket.socketpair()
+        transport, protocol = await loop.create_connection(lambda: FrameProtocol(codec, buffer_size=8), sock=right)
+        _, stream_writer = await asyncio.open_connection(sock=left)
+        writer = FrameWriter(stream_writer, codec)
+        writer.write_message(1, "simple_struct", simple_struct)
+        writer.write_message(1, "complex_struct", {})
+        writer.write_message(1, "empty_struct", {})
+        await writer.drain()
+        stream_writer.close()
+        while len(received) < 2:
+            await asyncio.sleep(0.01)
+        transport.close()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert [name for name, _ in received] == ["simple_struct", "empty_struct"]
+    assert received[0][1]["f3"] == simple_struct["f3"]
+
+
+def test_frame_protocol_coroutine_handlers_own_their_messages(codec):
+    pytest.importorskip("numpy")
+
+    view_codec = Codec(CodecOptions(numpy=True, bytes_view=True))
+    view_codec.load_yaml(
+        type_dirs=[path_root / "tests/msg/types", path_root / "tests/msg/types_decimal"],
+        protocols=[f"{path_root}/tests/msg/protocols:mynamespace/proto/test_proto"],
+    )
+    message_info = view_codec.message_info("mynamespace/proto/test_proto", "complex_struct")
+    converter = codec.type_converter("mynamespace/types/subspace/complex_struct")
+    first = converter.deserialize((path_root / "tests/data/serialized/bin/complex_struct.bin").read_bytes())
+    second = dict(first, bs=bytes(len(first["bs"])), vec_float=[0.0] * len(first["vec_float"]))
+
+    received = []
+
+    async def on_complex_struct(message):
+        await asyncio.sleep(0)
+        received.append((bytes(message["bs"]), message["vec_float"].tolist()))
+
+    view_codec.register_handler("mynamespace/proto/test_proto", "complex_struct", on_complex_struct)
+
+    async def run():
+        # Both frames are received before the handler tasks run, the second one overwrites the first in the buffer
+        protocol = FrameProtocol(view_codec, buffer_size=FrameHeader().size + len(converter.serialize(first)))
+        for message in [first, second]:
+            payload = converter.serialize(message)
+            protocol.data_received(FrameHeader().pack(message_info.proto_id(), message_info.message_id(), len(payload)))
+            protocol.data_received(payload)
+        while len(received) < 2:
+            await asyncio.sleep(0)
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert received == [(first["bs"], first["vec_float"]), (second["bs"], second["vec_float"])]
+
+
+def test_mapped_frame_reader(codec, tmp_path, recorded_frames):
+    frames = recorded_frames * 3
+    path = tmp_path / "recording.bin"
+    path.write_bytes(b"".join(FrameHeader().pack(proto_id, message_id, len(payload)) + payload for proto_id, message_id, payload in frames))
+
+    with MappedFrameReader(path, codec) as reader:
+        # Random access indexes only the beginning of the file
+        proto_id, message_id, payload = reader[2]
+        assert (proto_id, message_id, bytes(payload)) == frames[2]
+        payload.release()
+
+        assert [(proto_id, message_id, bytes(payload)) for proto_id, message_id, payload in reader] == frames
+        assert len(reader) == len(frames)
+        proto_id, message_id, payload = reader[-1]
+        assert (proto_id, message_id, bytes(payload)) == frames[-1]
+        payload.release()
+        with pytest.raises(IndexError):
+            reader[len(frames)]
+
+        expected = [(proto_id, message_id, codec.message_info_by_id(proto_id, message_id).type_converter().deserialize(payload))
+                    for proto_id, message_id, payload in frames]
+        assert list(reader.messages()) == expected
+        assert reader.message(3) == expected[3]
+
+
+def test_mapped_frame_reader_close_with_payloads_alive(codec, tmp_path, recorded_frames):
+    frames = recorded_frames
+    path = tmp_path / "recording.bin"
+    path.write_bytes(b"".join(FrameHeader().pack(proto_id, message_id, len(payload)) + payload for proto_id, message_id, payload in frames))
+
+    with MappedFrameReader(path) as reader:
+        for proto_id, message_id, payload in reader:
+            pass
+    # The last payload keeps the mapping alive
+    assert bytes(payload) == frames[-1][2]
+
+
+def test_mapped_frame_reader_empty_and_truncated_files(codec, tmp_path):
+    path = tmp_path / "recording.bin"
+    path.write_bytes(b"")
+    with MappedFrameReader(path, codec) as reader:
+        assert len(reader) == 0
+        assert list(reader) == []
+
+    payload = b"\x01" * 10
+    path.write_bytes(FrameHeader().pack(1, 0, len(payload)) + payload + FrameHeader().pack(1, 0, len(payload)) + payload[:-1])
+    with MappedFrameReader(path, codec) as reader:
+        with pytest.raises(MessgenError):
+            len(reader)
@@ -106,6 +106,30 @@ def test_outer_struct_hash_is_affected_by_nested_changes(nested_struct_type):
     assert actual != expected
 
 
+def test_hash_types_matches_hash_type(nested_struct_type):
+    outer_struct, types = nested_struct_type
+
+    type_hashes = model.hash_types(types)
+
+    assert set(type_hashes) == set(types)
+    for type_name, type_def in types.items():
+        assert type_hashes[type_name] == model.hash_type(type_def, types)
+
+
+def test_hash_type_uses_dependency_cache(nested_struct_type):
+    outer_struct, types = nested_struct_type
+    nested_struct = types[outer_struct.fields[0].type]
+
+    cache: dict[str, int | None] = {}
+    expected = model.hash_type(outer_struct, types, cache)
+    assert cache[nested_struct.type] == model.hash_type(nested_struct, types)
+
+    # Cached dependency hashes are reused as is
+    nested_struct.fields[0].name += "_modified"
+    assert model.hash_type(outer_struct, types, cache) == expected
+    assert model.hash_type(outer_struct, types) != expected
+
+
 def test_get_schema_returns_compact_json(simple_struct_type):
     struct_type, _ = simple_struct_type
     schema = model.get_schema(struct_type)
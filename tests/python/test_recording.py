@@ -0,0 +1,102 @@
+import io
+import pytest
+
+from messgen.dynamic import (
+    Codec,
+    MessgenError,
+)
+from messgen.recording import (
+    RecordingReader,
+    RecordingWriter,
+)
+
+
+def _write_recording(codec, frames, path, block_size=64):
+    # Timestamps repeat so that equal timestamps span blocks
+    written = []
+    with RecordingWriter(path, codec, block_size=block_size) as writer:
+        for i, (proto_id, message_id, payload) in enumerate(frames * 10):
+            writer.write(i // 2, proto_id, message_id, payload)
+            written.append((i // 2, proto_id, message_id, payload))
+    return written
+
+
+def test_recording(codec, tmp_path, recorded_frames):
+    path = tmp_path / "recording.mgr"
+    frames = _write_recording(codec, recorded_frames, path)
+
+    with RecordingReader(path, codec) as reader:
+        assert len(reader) == len(frames)
+        assert reader.time_range() == (0, frames[-1][0])
+        assert sorted(reader.message_types()) == sorted({(proto_id, message_id) for _, proto_id, message_id, _ in frames})
+        assert reader.protocol_hashes() == {1: codec.protocol_info_by_id(1).proto_hash()}
+
+        for start, stop, message_types in [
+            (None, None, None),
+            (3, 7, None),
+            (7, 3, None),
+            (5, None, [(1, 4)]),
+            (None, 20, [(1, 0), (1, 9), (5, 5)]),
+            (100, None, None),
+        ]:
+            expected = [
+                frame for frame in frames
+                if (start is None or frame[0] >= start) and (stop is None or frame[0] < stop)
+                and (message_types is None or frame[1:3] in message_types)
+            ]
+            selected = [(timestamp, proto_id, message_id, bytes(payload))
+                        for timestamp, proto_id, message_id, payload in reader.frames(start, stop, message_types)]
+            assert selected == expected
+
+        message_info = codec.message_info_by_name("mynamespace/proto/test_proto", "simple_struct")
+        messages = list(reader.messages(message_types=[(1, message_info.message_id())]))
+        assert len(messages) == 10
+        assert messages[0][3] == message_info.type_converter().deserialize(frames[0][3])
+
+
+def test_recording_reader_close_with_payloads_alive(codec, tmp_path, recorded_frames):
+    path = tmp_path / "recording.mgr"
+    frames = _write_recording(codec, recorded_frames, path)
+
+    with RecordingReader(path) as reader:
+        for timestamp, proto_id, message_id, payload in reader.frames():
+            pass
+    # The last payload keeps the mapping alive
+    assert bytes(payload) == frames[-1][3]
+
+
+def test_recording_writer_checks(codec, simple_struct):
+    file = io.BytesIO()
+    writer = RecordingWriter(file, codec)
+    writer.write_message(5, "mynamespace/proto/test_proto", "simple_struct", simple_struct)
+    with pytest.raises(MessgenError):
+        writer.write_message(4, 1, "empty_struct", {})
+    writer.close()
+    with pytest.raises(MessgenError):
+        writer.write(6, 1, 4, b"")
+
+
+def test_recording_reader_validates_schema(codec, tmp_path, recorded_frames):
+    path = tmp_path / "recording.mgr"
+    _write_recording(codec, recorded_frames, path)
+    data = path.read_bytes()
+
+    with RecordingReader(path) as reader:
+        assert len(reader) == 60
+
+    # Different protocol hash
+    path.write_bytes(data[:14] + bytes([data[14] ^ 1]) + data[15:])
+    with pytest.raises(MessgenError):
+        RecordingReader(path, codec)
+
+    # Unknown protocol
+    with pytest.raises(MessgenError):
+        RecordingReader(path, Codec())
+
+    # Not closed recording
+    path.write_bytes(data[:-1])
+    with pytest.raises(MessgenError):
+        RecordingReader(path)
+    path.write_bytes(b"")
+    with pytest.raises(MessgenError):
+        RecordingReader(path)